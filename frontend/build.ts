@@ -1,12 +1,14 @@
 // Production build script for bundling the frontend
-import {mkdirSync, readFileSync, writeFileSync} from 'fs'
-import {join} from 'path'
+import {mkdirSync, readFileSync, rmSync, writeFileSync} from 'fs'
+import {basename, join} from 'path'
+import {brotliCompressSync, constants, gzipSync} from 'zlib'
 
 const distDir = './dist'
 
 console.log('🔨 Building for production...\n')
 
-// Ensure dist directory exists
+// Start from a clean dist directory so stale hashed bundles don't pile up
+rmSync(distDir, {force: true, recursive: true})
 mkdirSync(distDir, {recursive: true})
 
 // Bundle TypeScript/TSX and CSS together
@@ -14,8 +16,10 @@ mkdirSync(distDir, {recursive: true})
 const result = await Bun.build({
     entrypoints: ['./src/main.tsx'],
     minify: true,
+    // Content hashes let the server mark bundles as immutable
     naming: {
-        entry: '[dir]/bundle.[ext]',
+        asset: '[name]-[hash].[ext]',
+        entry: '[dir]/bundle-[hash].[ext]',
     },
     outdir: distDir,
     sourcemap: 'external',
@@ -32,6 +36,7 @@ if (!result.success) {
 
 // Check if CSS was generated
 const outputs = result.outputs
+const jsOutput = outputs.find((o) => o.kind === 'entry-point')
 const cssOutput = outputs.find((o) => o.path.endsWith('.css'))
 if (!cssOutput) {
     console.warn('⚠️  No CSS output found - CSS imports from components may not be included')
@@ -41,14 +46,25 @@ if (!cssOutput) {
 let html = readFileSync('./src/index.html', 'utf-8')
 
 // Update paths to use /static/ prefix for FastAPI serving
-html = html.replace('./styles/main.css', '/static/bundle.css')
-html = html.replace('./main.tsx', '/static/bundle.js')
+if (cssOutput) {
+    html = html.replace('./styles/main.css', `/static/${basename(cssOutput.path)}`)
+}
+html = html.replace('./main.tsx', `/static/${basename(jsOutput!.path)}`)
 
 writeFileSync(join(distDir, 'index.html'), html)
 
+// Precompress text assets; the server picks a variant from Accept-Encoding
+const generated = [...outputs.map((o) => o.path), join(distDir, 'index.html')]
+for (const file of generated.filter((f) => /\.(css|html|js|map|svg)$/.test(f))) {
+    const content = readFileSync(file)
+    writeFileSync(`${file}.gz`, gzipSync(content, {level: 9}))
+    writeFileSync(`${file}.br`, brotliCompressSync(content, {
+        params: {[constants.BROTLI_PARAM_QUALITY]: constants.BROTLI_MAX_QUALITY},
+    }))
+}
+
 console.log('✅ Production build complete!')
 console.log('\nGenerated files:')
-console.log('  - dist/bundle.js')
-console.log('  - dist/bundle.js.map')
-console.log('  - dist/bundle.css')
-console.log('  - dist/index.html')
+for (const file of generated) {
+    console.log(`  - ${file} (+ .gz, .br)`)
+}
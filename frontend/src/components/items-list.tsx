@@ -19,11 +19,54 @@ function addLog(message: string, type: LogEntry['type'] = 'info') {
     $s.logs = [...$s.logs, entry]
 }
 
+// Helper to replace a single item with its current state from the API
+async function refetchItem(itemId: number) {
+    const config = getBackendConfig()
+    try {
+        const response = await fetch(`${config.api_url}/api/items/${itemId}`)
+        if (response.ok) {
+            const item: Item = await response.json()
+            $s.items = $s.items.map((i) => (i.id === item.id ? item : i))
+        }
+    } catch (error) {
+        console.error('Error refetching item:', error)
+    }
+}
+
+// Helper to apply a changed-columns-only UPDATE
+function applyPatch(notification: {id: number, patch: Partial<Item>, version: number}) {
+    const current = $s.items.find((i) => i.id === notification.id)
+    if (!current || notification.version <= current.version) {
+        return
+    }
+
+    if (notification.version !== current.version + 1) {
+        // Missed an update in between; the patch alone can't be trusted
+        refetchItem(notification.id)
+        return
+    }
+
+    const item = {...current, ...notification.patch, version: notification.version}
+    $s.items = $s.items.map((i) => (i.id === item.id ? item : i))
+}
+
 // Helper to handle websocket messages
 function handleWebSocketMessage(event: MessageEvent) {
     try {
         const notification = JSON.parse(event.data)
 
+        // A bulk job changed items with deferred notifications, or a gateway
+        // lost events from its relay (no table given: reload anyway)
+        if (notification.action === 'RESYNC' && (notification.table ?? 'items') === 'items') {
+            fetchItems()
+            return
+        }
+
+        if (notification.table === 'items' && notification.patch) {
+            applyPatch(notification)
+            return
+        }
+
         // Only handle item_changes notifications
         if (notification.table === 'items' && notification.data) {
             const item: Item = notification.data
@@ -75,26 +118,31 @@ async function deleteItem(itemId: number, itemName: string) {
     }
 }
 
+// Helper to (re)load all items from the API
+async function fetchItems() {
+    const config = getBackendConfig()
+    try {
+        const response = await fetch(`${config.api_url}/api/items`)
+        if (response.ok) {
+            const items = await response.json()
+            $s.items = items
+            addLog(`Loaded ${items.length} items from database`, 'info')
+        } else {
+            addLog(`Error fetching items: ${response.statusText}`, 'error')
+        }
+    } catch (error) {
+        addLog(`Network error fetching items: ${error}`, 'error')
+        console.error('Error fetching items:', error)
+    }
+}
+
+// Whether a connection was seen before; changes made while disconnected
+// never arrive over the socket, so every later connection reloads the list
+let connectedBefore = false
+
 export function ItemsList() {
     // Fetch items on component mount
     useEffect(() => {
-        const fetchItems = async () => {
-            const config = getBackendConfig()
-            try {
-                const response = await fetch(`${config.api_url}/api/items`)
-                if (response.ok) {
-                    const items = await response.json()
-                    $s.items = items
-                    addLog(`Loaded ${items.length} items from database`, 'info')
-                } else {
-                    addLog(`Error fetching items: ${response.statusText}`, 'error')
-                }
-            } catch (error) {
-                addLog(`Network error fetching items: ${error}`, 'error')
-                console.error('Error fetching items:', error)
-            }
-        }
-
         fetchItems()
 
         // Subscribe to websocket messages
@@ -111,10 +159,14 @@ export function ItemsList() {
         }
     }, [])
 
-    // Re-subscribe when websocket reconnects
+    // Re-subscribe (and catch up) when websocket reconnects
     useEffect(() => {
         const ws = $s.ws
         if (ws) {
+            if (connectedBefore) {
+                fetchItems()
+            }
+            connectedBefore = true
             ws.addEventListener('message', handleWebSocketMessage)
             return () => {
                 ws.removeEventListener('message', handleWebSocketMessage)
@@ -22,6 +22,7 @@ export interface Item {
     name: string
     updated_at: string
     value: number
+    version: number
 }
 
 export interface AppState {
@@ -20,6 +20,8 @@ export class WebSocketClient {
     private reconnectAttempts = 0
     private maxReconnectAttempts = 5
     private reconnectDelay = 1000
+    // Delay requested by a draining server, used instead of the backoff
+    private drainDelay: number | null = null
 
     connect() {
         const config = getBackendConfig()
@@ -37,6 +39,9 @@ export class WebSocketClient {
             ws.onmessage = (event) => {
                 try {
                     const data = JSON.parse(event.data)
+                    if (data.type === 'reconnect') {
+                        this.drainDelay = data.delay_ms
+                    }
                     addLog(JSON.stringify(data, null, 2), data.action || data.type)
                 } catch {
                     addLog(`Received: ${event.data}`, 'info')
@@ -48,6 +53,16 @@ export class WebSocketClient {
                 $s.ws = null
                 addLog('Disconnected from WebSocket', 'info')
 
+                // Server is restarting: come back after the staggered delay it asked for
+                if (this.drainDelay !== null) {
+                    const delay = this.drainDelay
+                    this.drainDelay = null
+                    this.reconnectAttempts = 0
+                    addLog(`Server restarting, reconnecting in ${delay}ms`, 'info')
+                    setTimeout(() => this.connect(), delay)
+                    return
+                }
+
                 // Attempt reconnection
                 if (this.reconnectAttempts < this.maxReconnectAttempts) {
                     setTimeout(() => {
@@ -0,0 +1,33 @@
+"""Diagnostics endpoints for tracing and profiling."""
+
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import PlainTextResponse
+
+from plank import tracing
+from plank.config import settings
+
+router = APIRouter(prefix="/debug", tags=["debug"])
+
+
+@router.get("/traces")
+async def get_traces():
+    """Get per-stage latency of recently sampled change events."""
+    if tracing.tracer is None:
+        raise HTTPException(status_code=404, detail="Tracing is disabled")
+    return {
+        "sample_rate": tracing.tracer.sample_rate,
+        "summary": tracing.tracer.summary(),
+        "traces": list(tracing.tracer.traces),
+    }
+
+
+@router.get("/profile", response_class=PlainTextResponse)
+async def get_profile(
+    seconds: float = Query(5.0, gt=0, le=60),
+    limit: int = Query(40, gt=0, le=500),
+    sort: str = Query("cumulative", pattern="^(cumulative|tottime|calls)$"),
+):
+    """Capture a CPU profile of the event loop for a few seconds."""
+    if not settings.profiling_enabled:
+        raise HTTPException(status_code=404, detail="Profiling is disabled")
+    return await tracing.profile(seconds, limit, sort)
@@ -1,41 +1,75 @@
 """API routes for items."""
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Response
+from pydantic import TypeAdapter
 
+from plank.config import settings
+from plank.db.aggregates import item_aggregates
+from plank.db.batcher import item_batcher
 from plank.db.connection import db
 from plank.db.models import Item, ItemCreate
+from plank.db.singleflight import SingleFlight
 
 router = APIRouter(prefix="/api", tags=["items"])
 
+# Identical concurrent reads share one query and one serialized response
+reads = SingleFlight()
+_item_json = TypeAdapter(Item)
+_items_json = TypeAdapter(list[Item])
+
+
+async def shared_read(query: str, *args, many: bool = True) -> bytes | None:
+    """Run a read query once for all concurrent identical requests.
+
+    Returns:
+        The JSON-encoded row(s), or None if a single-row read found nothing.
+    """
+
+    async def load():
+        if many:
+            rows = await db.fetch(query, *args)
+            return _items_json.dump_json(_items_json.validate_python([dict(row) for row in rows]))
+        row = await db.fetchrow(query, *args)
+        return _item_json.dump_json(_item_json.validate_python(dict(row))) if row else None
+
+    if not settings.coalesce_reads:
+        return await load()
+    return await reads.do((query, args, many), load)
+
 
 @router.get("/items", response_model=list[Item])
 async def get_items():
     """Get all items."""
-    rows = await db.fetch("SELECT * FROM items ORDER BY created_at DESC")
-    return [dict(row) for row in rows]
+    body = await shared_read("SELECT * FROM items ORDER BY created_at DESC")
+    return Response(body, media_type="application/json")
 
 
 @router.get("/items/{item_id}", response_model=Item)
 async def get_item(item_id: int):
     """Get a specific item by ID."""
-    row = await db.fetchrow("SELECT * FROM items WHERE id = $1", item_id)
-    if not row:
+    body = await shared_read("SELECT * FROM items WHERE id = $1", item_id, many=False)
+    if body is None:
         raise HTTPException(status_code=404, detail="Item not found")
-    return dict(row)
+    return Response(body, media_type="application/json")
 
 
 @router.post("/items", response_model=Item, status_code=201)
 async def create_item(item: ItemCreate):
     """Create a new item."""
-    row = await db.fetchrow(
-        """
-        INSERT INTO items (name, value)
-        VALUES ($1, $2)
-        RETURNING *
-        """,
-        item.name,
-        item.value,
-    )
+    if settings.write_batching:
+        row = await item_batcher.insert(item.name, item.value)
+    else:
+        row = await db.fetchrow(
+            """
+            INSERT INTO items (name, value)
+            VALUES ($1, $2)
+            RETURNING *
+            """,
+            item.name,
+            item.value,
+        )
+    # Reads in flight may predate this commit; the writer's next read must see it
+    reads.forget_all()
     return dict(row)
 
 
@@ -53,6 +87,7 @@ async def update_item(item_id: int, item: ItemCreate):
         item.value,
         item_id,
     )
+    reads.forget_all()
     if not row:
         raise HTTPException(status_code=404, detail="Item not found")
     return dict(row)
@@ -62,6 +97,14 @@ async def update_item(item_id: int, item: ItemCreate):
 async def delete_item(item_id: int):
     """Delete an item."""
     result = await db.execute("DELETE FROM items WHERE id = $1", item_id)
+    reads.forget_all()
     if result == "DELETE 0":
         raise HTTPException(status_code=404, detail="Item not found")
 
+
+@router.get("/aggregates")
+async def get_aggregates():
+    """Get count, sum, min and max of item values, maintained from the change stream."""
+    if not settings.aggregates:
+        raise HTTPException(status_code=404, detail="Aggregates are disabled")
+    return item_aggregates.snapshot()
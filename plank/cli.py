@@ -0,0 +1,82 @@
+"""Command line entry point: ``plank serve``."""
+
+import argparse
+import importlib.util
+
+import uvicorn
+
+from plank.config import settings
+
+
+def has_module(name: str) -> bool:
+    """Check whether an optional module can be imported."""
+    return importlib.util.find_spec(name) is not None
+
+
+def server_options(
+    host: str | None = None,
+    port: int | None = None,
+    workers: int | None = None,
+    reload: bool = False,
+) -> dict:
+    """Build the uvicorn options from settings.
+
+    uvloop and httptools are used when installed (they come with
+    ``uvicorn[standard]``), the pure-Python loop and parser otherwise.
+    """
+    workers = settings.workers if workers is None else workers
+    if workers > 1 and settings.role == "relay":
+        raise SystemExit("ROLE=relay needs a single worker: the relay port can only be bound once")
+    if workers > 1 and settings.webhook_urls:
+        raise SystemExit("Webhooks need a single worker: every worker would deliver each event")
+    if workers > 1 and settings.change_capture == "logical":
+        raise SystemExit("CHANGE_CAPTURE=logical needs a single worker: workers would share one replication slot")
+
+    return {
+        "host": host or settings.host,
+        "port": port or settings.port,
+        "workers": 1 if reload else workers,
+        "reload": reload,
+        "loop": "uvloop" if has_module("uvloop") else "asyncio",
+        "http": "httptools" if has_module("httptools") else "h11",
+        "backlog": settings.backlog,
+        "timeout_keep_alive": settings.keep_alive_s,
+        "timeout_graceful_shutdown": settings.graceful_shutdown_s,
+        "limit_concurrency": settings.limit_concurrency,
+        "ws_max_size": settings.ws_max_size,
+        "ws_ping_interval": settings.ws_ping_interval_s,
+        "ws_ping_timeout": settings.ws_ping_timeout_s,
+        "ws_per_message_deflate": settings.ws_per_message_deflate,
+        "access_log": settings.access_log,
+    }
+
+
+def serve(args: argparse.Namespace):
+    """Run the application server."""
+    options = server_options(args.host, args.port, args.workers, args.reload)
+    print(
+        f"✓ Serving on {options['host']}:{options['port']} "
+        f"(workers: {options['workers']}, loop: {options['loop']}, http: {options['http']})"
+    )
+    # Passed by name so worker and reloader processes can import it
+    uvicorn.run("plank.main:app", **options)
+
+
+def main(argv: list[str] | None = None):
+    """Parse the command line and run the chosen command."""
+    parser = argparse.ArgumentParser(prog="plank")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    serve_parser = commands.add_parser("serve", help="Run the application server")
+    serve_parser.add_argument("--host", help=f"Bind address (default: {settings.host})")
+    serve_parser.add_argument("--port", type=int, help=f"Port (default: {settings.port})")
+    serve_parser.add_argument("--workers", type=int, help=f"Worker processes (default: {settings.workers})")
+    serve_parser.add_argument("--reload", action="store_true", help="Reload on code changes (development)")
+    serve_parser.set_defaults(handler=serve)
+
+    args = parser.parse_args(argv)
+    args.handler(args)
+
+
+if __name__ == "__main__":
+    main()
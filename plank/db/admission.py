@@ -0,0 +1,117 @@
+"""Admission control for the connection pool.
+
+Queries wait for one of a fixed number of slots (the pool size) in priority
+order instead of piling up on ``pool.acquire()``. Each lane has a bounded
+wait queue and waits at most ``timeout``; beyond that the caller gets
+``OverloadedError`` straight away, which the API turns into 503 + Retry-After.
+
+The lane comes from ``current_lane``, set per HTTP request: writes go ahead
+of list reads, and internal work (listener callbacks, aggregate reloads,
+bulk jobs) goes ahead of both.
+"""
+
+import asyncio
+import heapq
+import itertools
+from collections import Counter
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+
+from plank.config import settings
+
+# Lower value is served first
+LANES = {"system": 0, "write": 1, "read": 2}
+
+current_lane: ContextVar[str] = ContextVar("plank_lane", default="system")
+
+
+class OverloadedError(Exception):
+    """Raised when a query is refused a pool slot."""
+
+    def __init__(self, lane: str, reason: str, retry_after: int):
+        super().__init__(f"{lane} lane {reason}")
+        self.lane = lane
+        self.retry_after = retry_after
+
+
+class Admission:
+    """Hands out pool slots by lane priority with bounded waiting."""
+
+    def __init__(
+        self,
+        slots: int | None = None,
+        max_waiting: dict[str, int] | None = None,
+        timeout: float | None = None,
+        retry_after: int | None = None,
+    ):
+        self.slots = settings.pool_max_size if slots is None else slots
+        self.max_waiting = max_waiting or {
+            "system": settings.max_waiting_writes,
+            "write": settings.max_waiting_writes,
+            "read": settings.max_waiting_reads,
+        }
+        self.timeout = settings.pool_acquire_timeout_ms / 1000 if timeout is None else timeout
+        self.retry_after = settings.retry_after_s if retry_after is None else retry_after
+
+        self.in_use = 0
+        self.waiting: Counter[str] = Counter()
+        self.rejected: Counter[str] = Counter()
+        self._waiters: list[tuple[int, int, asyncio.Future]] = []
+        self._order = itertools.count()
+
+    @asynccontextmanager
+    async def slot(self, lane: str | None = None):
+        """Hold a slot for the duration of the block."""
+        await self.acquire(lane or current_lane.get())
+        try:
+            yield
+        finally:
+            self.release()
+
+    async def acquire(self, lane: str):
+        """Wait for a free slot, or raise ``OverloadedError``."""
+        if self.in_use < self.slots and not self._waiters:
+            self.in_use += 1
+            return
+
+        if self.waiting[lane] >= self.max_waiting[lane]:
+            self._reject(lane, "queue full")
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (LANES[lane], next(self._order), future))
+        self.waiting[lane] += 1
+        try:
+            await asyncio.wait_for(asyncio.shield(future), self.timeout)
+        except BaseException as e:
+            if future.done():
+                # A slot was handed over just as we gave up; pass it on
+                self.release()
+            else:
+                future.cancel()
+            if isinstance(e, TimeoutError):
+                self._reject(lane, "wait timed out")
+            raise
+        finally:
+            self.waiting[lane] -= 1
+
+    def release(self):
+        """Hand the slot to the highest-priority waiter, or free it."""
+        while self._waiters:
+            _, _, future = heapq.heappop(self._waiters)
+            if not future.done():
+                future.set_result(None)
+                return
+        self.in_use -= 1
+
+    def _reject(self, lane: str, reason: str):
+        self.rejected[lane] += 1
+        raise OverloadedError(lane, reason, self.retry_after) from None
+
+    def stats(self) -> dict:
+        """Current slot usage, queue lengths and rejection counts."""
+        return {
+            "in_use": self.in_use,
+            "slots": self.slots,
+            "waiting": {lane: self.waiting[lane] for lane in LANES},
+            "rejected": {lane: self.rejected[lane] for lane in LANES},
+        }
@@ -0,0 +1,257 @@
+"""Incrementally maintained aggregates over the change stream."""
+
+import heapq
+from collections import Counter
+
+from plank.config import settings
+from plank.db.connection import Database, db
+
+
+def xid_visible(snapshot: str, xid: int) -> bool:
+    """Whether transaction ``xid`` had finished as of a ``pg_snapshot`` text value."""
+    xmin, xmax, in_progress = snapshot.split(":")
+    if xid < int(xmin):
+        return True
+    if xid >= int(xmax):
+        return False
+    return str(xid) not in in_progress.split(",")
+
+
+class AggregateStats:
+    """Count, sum, min and max of a column, updatable by single-row deltas.
+
+    Values are kept as a multiset plus a min-heap and a max-heap of distinct
+    values. Heap entries for values that are gone are discarded lazily when
+    they reach the top, so replacing a removed minimum or maximum costs
+    O(log n) amortized.
+    """
+
+    __slots__ = ("count", "total", "values", "min", "max", "_low", "_high")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0
+        self.values: Counter = Counter()
+        self.min = None
+        self.max = None
+        self._low: list = []
+        self._high: list = []
+
+    def add(self, value, n: int = 1):
+        """Account for ``n`` rows holding ``value``."""
+        if value is None:
+            return
+        self.count += n
+        self.total += value * n
+        if not self.values[value]:
+            self._push(value)
+        self.values[value] += n
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    def _push(self, value):
+        if len(self._low) > 2 * len(self.values) + 64:
+            # Too many stale entries: rebuild from the live values
+            self._low = list(self.values)
+            self._high = [-v for v in self.values]
+            heapq.heapify(self._low)
+            heapq.heapify(self._high)
+        heapq.heappush(self._low, value)
+        heapq.heappush(self._high, -value)
+
+    def _top(self, heap: list, sign: int):
+        while heap and not self.values[sign * heap[0]]:
+            heapq.heappop(heap)
+        return sign * heap[0] if heap else None
+
+    def remove(self, value):
+        """Account for one row holding ``value`` going away."""
+        if value is None or self.values[value] <= 0:
+            return
+        self.count -= 1
+        self.total -= value
+        self.values[value] -= 1
+        if self.values[value] == 0:
+            del self.values[value]
+            if value == self.min:
+                self.min = self._top(self._low, 1)
+            if value == self.max:
+                self.max = self._top(self._high, -1)
+
+    def snapshot(self) -> dict:
+        """Return the current aggregate values."""
+        return {"count": self.count, "sum": self.total, "min": self.min, "max": self.max}
+
+
+class ItemAggregates:
+    """Server-side aggregates of ``items.value``, global and optionally grouped.
+
+    State is loaded with a single query and then maintained from change
+    events: INSERT adds the new row, DELETE removes the old row and UPDATE
+    does both using the ``old`` image carried in the event. Diff-mode UPDATE
+    events (``patch``) are applied when they carry every column the state
+    depends on; otherwise ``apply`` reports them and ``refresh`` reloads.
+
+    Events that arrive during a load are held back and replayed once the
+    load query returns. Any event whose transaction (``xid`` in the payload)
+    was visible to the last load's snapshot is skipped, whenever it arrives:
+    its change is already in the loaded state. This covers notifications
+    delivered after the load result and a replication slot re-delivering its
+    backlog. Events without an ``xid`` are always applied.
+    """
+
+    def __init__(
+        self,
+        column: str = "value",
+        group_by: str | None = None,
+        database: Database = db,
+    ):
+        for name in (column, group_by):
+            if name is not None and not name.isidentifier():
+                raise ValueError(f"Invalid column name: {name!r}")
+        self.column = column
+        self.group_by = group_by
+        self.database = database
+        self.totals = AggregateStats()
+        self.groups: dict[str, AggregateStats] = {}
+        self._refreshing = False
+        self._refresh_again = False
+        # Events held back while a load runs; None when applying directly
+        self._held: list | None = None
+        # pg_snapshot text of the last load; changes visible to it are counted
+        self._snapshot: str | None = None
+
+    async def load(self):
+        """Initialize state from the current table contents."""
+        self._held = []
+        group = self.group_by or "NULL"
+        try:
+            # One statement, so the snapshot is the one the aggregation saw
+            rows = await self.database.fetch(
+                f"""
+                SELECT s.snapshot, g.grp, g.value, g.n
+                FROM (SELECT pg_current_snapshot()::text AS snapshot) AS s
+                LEFT JOIN (
+                    SELECT {group} AS grp, {self.column} AS value, count(*) AS n
+                    FROM items
+                    GROUP BY 1, 2
+                ) AS g ON true
+                """
+            )
+        except BaseException:
+            # Keep the old state current at least
+            held, self._held = self._held, None
+            for event in held:
+                self._apply(event)
+            raise
+
+        self.totals = AggregateStats()
+        self.groups = {}
+        for row in rows:
+            if row["n"] is None:
+                continue
+            self.totals.add(row["value"], row["n"])
+            if self.group_by:
+                self._group(row["grp"]).add(row["value"], row["n"])
+
+        self._snapshot = rows[0]["snapshot"]
+        held, self._held = self._held, None
+        for event in held:
+            if not self._apply_unseen(event):
+                self._refresh_again = True
+
+    async def refresh(self):
+        """Reload state, coalescing requests made during a reload into one more."""
+        if self._refreshing:
+            self._refresh_again = True
+            return
+
+        self._refreshing = True
+        try:
+            self._refresh_again = True
+            while self._refresh_again:
+                self._refresh_again = False
+                await self.load()
+        finally:
+            self._refreshing = False
+
+    def _group(self, key) -> AggregateStats:
+        key = str(key)
+        if key not in self.groups:
+            self.groups[key] = AggregateStats()
+        return self.groups[key]
+
+    def _add(self, row: dict):
+        self.totals.add(row.get(self.column))
+        if self.group_by:
+            self._group(row.get(self.group_by)).add(row.get(self.column))
+
+    def _remove(self, row: dict):
+        self.totals.remove(row.get(self.column))
+        if self.group_by:
+            key = str(row.get(self.group_by))
+            stats = self.groups.get(key)
+            if stats is not None:
+                stats.remove(row.get(self.column))
+                if stats.count == 0:
+                    del self.groups[key]
+
+    def apply(self, event: dict) -> bool:
+        """Apply one change event, or hold it back while a load is running.
+
+        Returns:
+            True if the event was applied as a delta or held back.
+        """
+        if self._held is not None:
+            self._held.append(event)
+            return True
+        return self._apply_unseen(event)
+
+    def _apply_unseen(self, event: dict) -> bool:
+        """Apply an event unless the last load already counted its transaction."""
+        xid = event.get("xid")
+        if xid is not None and self._snapshot is not None and xid_visible(self._snapshot, xid):
+            return True
+        return self._apply(event)
+
+    def _apply(self, event: dict) -> bool:
+        action = event.get("action")
+        data = event.get("data") or {}
+        if action == "INSERT":
+            self._add(data)
+        elif action == "DELETE":
+            self._remove(data)
+        elif action == "UPDATE" and "patch" in event:
+            return self._apply_patch(event["patch"], event.get("old") or {})
+        elif action == "UPDATE" and "old" in event:
+            self._remove(event["old"])
+            self._add(data)
+        else:
+            return False
+        return True
+
+    def _apply_patch(self, patch: dict, old: dict) -> bool:
+        needed = [name for name in (self.column, self.group_by) if name]
+        changed = [name for name in needed if name in patch]
+        if not changed:
+            return True
+        if len(changed) < len(needed):
+            # e.g. value changed but the (unchanged) group key isn't in the patch
+            return False
+        self._remove(old)
+        self._add(patch)
+        return True
+
+    def snapshot(self) -> dict:
+        """Return global and per-group aggregates."""
+        result = {"global": self.totals.snapshot()}
+        if self.group_by:
+            result["group_by"] = self.group_by
+            result["groups"] = {key: stats.snapshot() for key, stats in self.groups.items()}
+        return result
+
+
+# Global aggregates instance
+item_aggregates = ItemAggregates(group_by=settings.aggregate_group_by)
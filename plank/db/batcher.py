@@ -0,0 +1,125 @@
+"""Write coalescing for concurrent single-row inserts."""
+
+import asyncio
+
+import asyncpg
+
+from plank.config import settings
+from plank.db.connection import Database, db
+
+
+class InsertBatcher:
+    """Coalesces concurrent single-row inserts into one multi-row INSERT.
+
+    Callers submit one row each and wait for it. Rows arriving within a short
+    window are written with a single ``INSERT ... SELECT unnest(...) RETURNING``
+    on one pool connection, and each caller gets its own row back. If the
+    batched statement is rejected because of its data, rows are retried one
+    by one so a bad row only fails its own caller. Any other failure
+    (overload, lost connection, timeout) is passed to every caller as is.
+    """
+
+    def __init__(
+        self,
+        table: str,
+        columns: dict[str, str],
+        database: Database = db,
+        window: float | None = None,
+        max_size: int | None = None,
+    ):
+        """
+        Args:
+            table: Table to insert into.
+            columns: Column name -> SQL type, in submission order.
+            database: Database used to execute the inserts.
+            window: Seconds to wait for more rows after the first arrives.
+            max_size: Flush immediately once this many rows are pending.
+        """
+        self.table = table
+        self.columns = list(columns)
+        self.database = database
+        self.window = settings.write_batch_window_ms / 1000 if window is None else window
+        self.max_size = settings.write_batch_max_size if max_size is None else max_size
+
+        names = ", ".join(self.columns)
+        arrays = ", ".join(f"${i}::{t}[]" for i, t in enumerate(columns.values(), start=1))
+        placeholders = ", ".join(f"${i}" for i in range(1, len(self.columns) + 1))
+        self._batch_sql = f"""
+            INSERT INTO {table} ({names})
+            SELECT {names} FROM unnest({arrays}) WITH ORDINALITY AS t({names}, ord)
+            ORDER BY ord
+            RETURNING *
+        """
+        self._single_sql = f"INSERT INTO {table} ({names}) VALUES ({placeholders}) RETURNING *"
+
+        self._pending: list[tuple[tuple, asyncio.Future]] = []
+        self._timer: asyncio.TimerHandle | None = None
+        self._tasks: set[asyncio.Task] = set()
+
+    async def insert(self, *values):
+        """Insert one row and return it once its batch has committed."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((values, future))
+
+        if len(self._pending) >= self.max_size:
+            self._flush_pending()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush_pending)
+
+        return await future
+
+    def _flush_pending(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.create_task(self._write(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _write(self, batch: list[tuple[tuple, asyncio.Future]]):
+        if len(batch) == 1:
+            await self._write_each(batch)
+            return
+
+        arrays = [list(column) for column in zip(*(values for values, _ in batch), strict=True)]
+        try:
+            rows = await self.database.fetch(self._batch_sql, *arrays)
+        except (asyncpg.DataError, asyncpg.IntegrityConstraintViolationError):
+            await self._write_each(batch)
+            return
+        except Exception as e:
+            # Retrying row by row would only multiply the load on a failing database
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        # Sequence values are assigned in ORDER BY ord, so id order is submission order
+        rows = sorted(rows, key=lambda row: row["id"])
+        for (_, future), row in zip(batch, rows, strict=True):
+            if not future.done():
+                future.set_result(row)
+
+    async def _write_each(self, batch: list[tuple[tuple, asyncio.Future]]):
+        for values, future in batch:
+            try:
+                row = await self.database.fetchrow(self._single_sql, *values)
+            except Exception as e:
+                if not future.done():
+                    future.set_exception(e)
+            else:
+                if not future.done():
+                    future.set_result(row)
+
+    async def flush(self):
+        """Write any pending rows and wait for in-flight batches."""
+        self._flush_pending()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+
+# Global batcher for item inserts
+item_batcher = InsertBatcher("items", {"name": "varchar", "value": "integer"})
@@ -1,8 +1,17 @@
 """Database connection pool management."""
 
+import time
+from contextlib import asynccontextmanager
+from typing import TYPE_CHECKING
+
 import asyncpg
 
 from plank.config import settings
+from plank.db.admission import Admission
+from plank.hooks import emit
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
 
 
 class Database:
@@ -10,13 +19,21 @@ class Database:
 
     def __init__(self):
         self.pool: asyncpg.Pool | None = None
+        # Queries wait here, by priority and with a bounded queue, not on the pool
+        self.admission = Admission()
+        # Called as hook(query, args, started_at, finished_at) after each query
+        self.on_query: list[Callable] = []
 
     async def connect(self):
         """Create database connection pool."""
+        server_settings = {}
+        if settings.statement_timeout_ms:
+            server_settings["statement_timeout"] = str(int(settings.statement_timeout_ms))
         self.pool = await asyncpg.create_pool(
             settings.database_url,
-            min_size=2,
-            max_size=10,
+            min_size=settings.pool_min_size,
+            max_size=settings.pool_max_size,
+            server_settings=server_settings,
         )
         print("✓ Database pool connected")
 
@@ -26,20 +43,44 @@ class Database:
             await self.pool.close()
             print("✓ Database pool closed")
 
+    async def _run(self, method: str, query: str, *args):
+        """Run a query with a pooled connection, reporting it to ``on_query`` hooks."""
+        async with self.admission.slot(), self.pool.acquire() as conn:
+            if not self.on_query:
+                return await getattr(conn, method)(query, *args)
+            started = time.time()
+            try:
+                return await getattr(conn, method)(query, *args)
+            finally:
+                emit(self.on_query, query, args, started, time.time())
+
+    @asynccontextmanager
+    async def quiet(self, notify: str = "defer"):
+        """Run a transaction with change notifications muted or deferred.
+
+        Yields a pooled connection inside a transaction where the notify
+        trigger is switched via the ``plank.notify`` setting: ``"defer"``
+        replaces per-row events with one ``RESYNC`` event at commit, ``"off"``
+        sends nothing at all.
+        """
+        if notify not in ("defer", "off"):
+            raise ValueError(f"Invalid notify mode: {notify!r}")
+
+        async with self.admission.slot(), self.pool.acquire() as conn, conn.transaction():
+            await conn.execute("SELECT set_config('plank.notify', $1, true)", notify)
+            yield conn
+
     async def execute(self, query: str, *args):
         """Execute a query."""
-        async with self.pool.acquire() as conn:
-            return await conn.execute(query, *args)
+        return await self._run("execute", query, *args)
 
     async def fetch(self, query: str, *args):
         """Fetch multiple rows."""
-        async with self.pool.acquire() as conn:
-            return await conn.fetch(query, *args)
+        return await self._run("fetch", query, *args)
 
     async def fetchrow(self, query: str, *args):
         """Fetch a single row."""
-        async with self.pool.acquire() as conn:
-            return await conn.fetchrow(query, *args)
+        return await self._run("fetchrow", query, *args)
 
 
 # Global database instance
@@ -7,58 +7,127 @@ import asyncpg
 from plank.config import settings
 
 
-async def init_database():
-    """Initialize database with tables and triggers."""
-    conn = await asyncpg.connect(settings.database_url)
-
-    try:
-        # Create items table
-        await conn.execute("""
-            CREATE TABLE IF NOT EXISTS items (
-                id SERIAL PRIMARY KEY,
-                name VARCHAR(255) NOT NULL,
-                value INTEGER NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            );
-        """)
-        print("✓ Created items table")
-
-        # Create notification function
+async def create_schema(conn: asyncpg.Connection):
+    """Create tables and triggers on an open connection."""
+    # Create items table
+    await conn.execute("""
+        CREATE TABLE IF NOT EXISTS items (
+            id SERIAL PRIMARY KEY,
+            name VARCHAR(255) NOT NULL,
+            value INTEGER NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            version INTEGER NOT NULL DEFAULT 1
+        );
+        ALTER TABLE items ADD COLUMN IF NOT EXISTS version INTEGER NOT NULL DEFAULT 1;
+    """)
+    print("✓ Created items table")
+
+    if settings.update_events == "diff":
+        # Only changed columns (and their old values) plus the row version
+        update_payload = """
+                old_row = to_jsonb(OLD);
+                SELECT jsonb_object_agg(n.key, n.value), jsonb_object_agg(n.key, old_row -> n.key)
+                INTO patch, old_values
+                FROM jsonb_each(to_jsonb(NEW)) AS n
+                WHERE n.key NOT IN ('id', 'version')
+                AND n.value IS DISTINCT FROM old_row -> n.key;
+
+                payload = json_build_object(
+                    'table', TG_TABLE_NAME,
+                    'action', TG_OP,
+                    'ts', extract(epoch FROM clock_timestamp()),
+                    'xid', pg_current_xact_id()::text::bigint,
+                    'id', NEW.id,
+                    'version', NEW.version,
+                    'patch', COALESCE(patch, '{}'::jsonb),
+                    'old', COALESCE(old_values, '{}'::jsonb)
+                );"""
+    else:
+        # OLD lets consumers apply deltas without caching rows
+        update_payload = """
+                payload = json_build_object(
+                    'table', TG_TABLE_NAME,
+                    'action', TG_OP,
+                    'ts', extract(epoch FROM clock_timestamp()),
+                    'xid', pg_current_xact_id()::text::bigint,
+                    'id', NEW.id,
+                    'data', row_to_json(NEW),
+                    'old', row_to_json(OLD)
+                );"""
+
+    # Create notification function
+    await conn.execute(f"""
+        CREATE OR REPLACE FUNCTION notify_item_changes()
+        RETURNS TRIGGER AS $$
+        DECLARE
+            payload JSON;
+            old_row JSONB;
+            patch JSONB;
+            old_values JSONB;
+            notify_mode TEXT;
+        BEGIN
+            -- Sessions can mute ('off') or defer ('defer') notifications, e.g. for backfills
+            notify_mode = COALESCE(NULLIF(current_setting('plank.notify', true), ''), 'on');
+            IF (notify_mode = 'off') THEN
+                RETURN NULL;
+            END IF;
+
+            -- Nothing changed, nothing to tell anyone
+            IF (TG_OP = 'UPDATE' AND OLD IS NOT DISTINCT FROM NEW) THEN
+                RETURN NULL;
+            END IF;
+
+            IF (notify_mode = 'defer') THEN
+                -- Identical payloads are collapsed by Postgres into one per transaction
+                PERFORM pg_notify(
+                    'item_changes',
+                    json_build_object('table', TG_TABLE_NAME, 'action', 'RESYNC')::text
+                );
+                RETURN NULL;
+            END IF;
+
+            IF (TG_OP = 'DELETE') THEN
+                payload = json_build_object(
+                    'table', TG_TABLE_NAME,
+                    'action', TG_OP,
+                    'ts', extract(epoch FROM clock_timestamp()),
+                    'xid', pg_current_xact_id()::text::bigint,
+                    'id', OLD.id,
+                    'data', row_to_json(OLD)
+                );
+            ELSIF (TG_OP = 'UPDATE') THEN{update_payload}
+            ELSE
+                payload = json_build_object(
+                    'table', TG_TABLE_NAME,
+                    'action', TG_OP,
+                    'ts', extract(epoch FROM clock_timestamp()),
+                    'xid', pg_current_xact_id()::text::bigint,
+                    'id', NEW.id,
+                    'data', row_to_json(NEW)
+                );
+            END IF;
+
+            PERFORM pg_notify('item_changes', payload::text);
+
+            IF (TG_OP = 'DELETE') THEN
+                RETURN OLD;
+            ELSE
+                RETURN NEW;
+            END IF;
+        END;
+        $$ LANGUAGE plpgsql;
+    """)
+    print("✓ Created notification function")
+
+    if settings.change_capture == "logical":
+        # Changes are read from the replication slot; keep the write path trigger-free
         await conn.execute("""
-            CREATE OR REPLACE FUNCTION notify_item_changes()
-            RETURNS TRIGGER AS $$
-            DECLARE
-                payload JSON;
-            BEGIN
-                IF (TG_OP = 'DELETE') THEN
-                    payload = json_build_object(
-                        'table', TG_TABLE_NAME,
-                        'action', TG_OP,
-                        'id', OLD.id,
-                        'data', row_to_json(OLD)
-                    );
-                ELSE
-                    payload = json_build_object(
-                        'table', TG_TABLE_NAME,
-                        'action', TG_OP,
-                        'id', NEW.id,
-                        'data', row_to_json(NEW)
-                    );
-                END IF;
-
-                PERFORM pg_notify('item_changes', payload::text);
-
-                IF (TG_OP = 'DELETE') THEN
-                    RETURN OLD;
-                ELSE
-                    RETURN NEW;
-                END IF;
-            END;
-            $$ LANGUAGE plpgsql;
+            DROP TRIGGER IF EXISTS items_notify_trigger ON items;
+            ALTER TABLE items REPLICA IDENTITY FULL;
         """)
-        print("✓ Created notification function")
-
+        print("✓ Configured items table for logical decoding")
+    else:
         # Create trigger
         await conn.execute("""
             DROP TRIGGER IF EXISTS items_notify_trigger ON items;
@@ -68,28 +137,37 @@ async def init_database():
         """)
         print("✓ Created trigger on items table")
 
-        # Create update timestamp function
-        await conn.execute("""
-            CREATE OR REPLACE FUNCTION update_updated_at_column()
-            RETURNS TRIGGER AS $$
-            BEGIN
-                NEW.updated_at = CURRENT_TIMESTAMP;
-                RETURN NEW;
-            END;
-            $$ LANGUAGE plpgsql;
-        """)
+    # Create update timestamp function
+    await conn.execute("""
+        CREATE OR REPLACE FUNCTION update_updated_at_column()
+        RETURNS TRIGGER AS $$
+        BEGIN
+            NEW.updated_at = CURRENT_TIMESTAMP;
+            NEW.version = OLD.version + 1;
+            RETURN NEW;
+        END;
+        $$ LANGUAGE plpgsql;
+    """)
+
+    # Create update timestamp trigger
+    await conn.execute("""
+        DROP TRIGGER IF EXISTS update_items_updated_at ON items;
+        CREATE TRIGGER update_items_updated_at
+        BEFORE UPDATE ON items
+        FOR EACH ROW
+        WHEN (OLD.* IS DISTINCT FROM NEW.*)
+        EXECUTE FUNCTION update_updated_at_column();
+    """)
+    print("✓ Created updated_at trigger")
 
-        # Create update timestamp trigger
-        await conn.execute("""
-            DROP TRIGGER IF EXISTS update_items_updated_at ON items;
-            CREATE TRIGGER update_items_updated_at
-            BEFORE UPDATE ON items
-            FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
-        """)
-        print("✓ Created updated_at trigger")
 
-        print("\n✅ Database initialized successfully!")
+async def init_database():
+    """Initialize database with tables and triggers."""
+    conn = await asyncpg.connect(settings.database_url)
 
+    try:
+        await create_schema(conn)
+        print("\n✅ Database initialized successfully!")
     finally:
         await conn.close()
 
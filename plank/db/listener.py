@@ -2,11 +2,17 @@
 
 import asyncio
 import json
-from collections.abc import Callable
+import time
+from collections.abc import Callable, Mapping
 
 import asyncpg
 
 from plank.config import settings
+from plank.events import RawEvent
+from plank.hooks import emit
+
+# How json_build_object('table', ...) output starts, i.e. the trigger's payloads
+TRIGGER_PAYLOAD_PREFIX = '{"table" : '
 
 
 class PostgresListener:
@@ -16,6 +22,12 @@ class PostgresListener:
         self.connection: asyncpg.Connection | None = None
         self.callbacks: dict[str, list[Callable]] = {}
         self._running = False
+        # Hand trigger payloads on undecoded (see RawEvent)
+        self.passthrough = settings.passthrough_events
+        # Called as hook(channel, payload, received_at) for each raw notification
+        self.on_notify: list[Callable] = []
+        # Called as hook(channel, data, received_at, finished_at) after callbacks ran
+        self.on_dispatch: list[Callable] = []
 
     async def connect(self):
         """Connect to PostgreSQL and start listening."""
@@ -45,12 +57,27 @@ class PostgresListener:
 
     async def _notification_handler(self, connection, pid, channel, payload):
         """Handle incoming notifications."""
-        try:
-            data = json.loads(payload)
-        except json.JSONDecodeError:
-            data = {"raw": payload}
+        received = time.time()
+        if self.on_notify:
+            emit(self.on_notify, channel, payload, received)
+
+        if self.passthrough and payload.startswith(TRIGGER_PAYLOAD_PREFIX):
+            # Written by our trigger, so known to be valid JSON; anything else
+            # (e.g. a hand-sent NOTIFY) is decoded and checked below
+            data = RawEvent(payload)
+        else:
+            try:
+                data = json.loads(payload)
+            except json.JSONDecodeError:
+                data = {"raw": payload}
+
+        await self._dispatch(channel, data, received)
+
+    async def _dispatch(self, channel: str, data: Mapping, received: float | None = None):
+        """Deliver a decoded event to the callbacks registered for its channel."""
+        if self.on_dispatch and received is None:
+            received = time.time()
 
-        # Call all registered callbacks for this channel
         if channel in self.callbacks:
             for callback in self.callbacks[channel]:
                 try:
@@ -61,6 +88,9 @@ class PostgresListener:
                 except Exception as e:
                     print(f"Error in callback for {channel}: {e}")
 
+        if self.on_dispatch:
+            emit(self.on_dispatch, channel, data, received, time.time())
+
     async def start(self):
         """Keep the listener running."""
         self._running = True
@@ -71,6 +101,14 @@ class PostgresListener:
             pass
 
 
-# Global listener instance
-listener = PostgresListener()
+def create_listener() -> PostgresListener:
+    """Create the change-capture backend selected in settings."""
+    if settings.role == "gateway":
+        from plank.relay import RelayClient
+
+        return RelayClient()
+    if settings.change_capture == "logical":
+        from plank.db.logical import LogicalListener
 
+        return LogicalListener()
+    return PostgresListener()
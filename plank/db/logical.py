@@ -0,0 +1,253 @@
+"""Logical decoding change capture.
+
+Reads row changes from a logical replication slot instead of relying on
+``pg_notify`` triggers. Changes are peeked from the slot, dispatched to the
+same callbacks as ``PostgresListener`` and only then confirmed, so delivery is
+ordered, survives restarts and is not bound by the 8KB NOTIFY payload limit.
+
+Requires ``wal_level = logical`` on the server and ``REPLICA IDENTITY FULL`` on
+captured tables so UPDATE and DELETE events carry the complete old row.
+"""
+
+import asyncio
+import json
+import re
+
+from plank.config import settings
+from plank.db.listener import PostgresListener
+
+_ACTIONS = {"I": "INSERT", "U": "UPDATE", "D": "DELETE"}
+
+_INT_TYPES = {"smallint", "integer", "bigint", "int2", "int4", "int8"}
+_FLOAT_TYPES = {"real", "double precision", "float4", "float8"}
+
+_HEADER = re.compile(r"^table (?P<relation>\S+): (?P<action>[A-Z]+):(?P<rest>.*)$", re.DOTALL)
+_TOKEN = re.compile(
+    r"""\s*(?:
+        (?P<marker>old-key|new-tuple):
+      | (?P<name>"(?:[^"]|"")*"|[^\[\s]+)
+        \[(?P<type>.+?)\]:
+        (?P<value>'(?:[^']|'')*'|\S+)
+    )""",
+    re.VERBOSE | re.DOTALL,
+)
+
+
+def _unquote_ident(name: str) -> str:
+    if name.startswith('"') and name.endswith('"'):
+        return name[1:-1].replace('""', '"')
+    return name
+
+
+def _normalize(type_name: str, value):
+    """Coerce a decoded column value to what ``row_to_json`` would produce."""
+    if value is None:
+        return None
+    if isinstance(value, str):
+        if type_name in _INT_TYPES:
+            return int(value)
+        if type_name in _FLOAT_TYPES:
+            return float(value)
+        if type_name == "numeric":
+            try:
+                return json.loads(value)
+            except json.JSONDecodeError:
+                return value
+        if type_name == "boolean":
+            return value == "true"
+        if type_name in ("json", "jsonb"):
+            return json.loads(value)
+        if type_name.startswith("timestamp") or type_name == "date":
+            return value.replace(" ", "T", 1)
+    return value
+
+
+def _event(table: str, action: str, data: dict) -> dict:
+    return {"table": table, "action": action, "id": data.get("id"), "data": data}
+
+
+def parse_test_decoding(line: str) -> dict | None:
+    """Parse one ``test_decoding`` output line into a change event.
+
+    Returns ``None`` for transaction markers and statements that are not row
+    changes (e.g. TRUNCATE).
+    """
+    match = _HEADER.match(line)
+    if not match or match["action"] not in ("INSERT", "UPDATE", "DELETE"):
+        return None
+
+    table = _unquote_ident(match["relation"].rsplit(".", 1)[-1])
+    old: dict = {}
+    new: dict = {}
+    target = new
+    rest = match["rest"]
+    pos = 0
+    while pos < len(rest):
+        token = _TOKEN.match(rest, pos)
+        if not token:
+            break
+        pos = token.end()
+        if token["marker"] == "old-key":
+            target = old
+            continue
+        if token["marker"] == "new-tuple":
+            target = new
+            continue
+        raw = token["value"]
+        if raw == "unchanged-toast-datum":
+            continue
+        if raw == "null":
+            value = None
+        elif raw.startswith("'"):
+            value = raw[1:-1].replace("''", "'")
+        else:
+            value = raw
+        target[_unquote_ident(token["name"])] = _normalize(token["type"], value)
+
+    action = match["action"]
+    if action == "DELETE":
+        return _event(table, action, new)
+    # Unchanged TOASTed values only appear in the old image
+    event = _event(table, action, {**old, **new})
+    if old:
+        event["old"] = old
+    return event
+
+
+def parse_wal2json(line: str) -> dict | None:
+    """Parse one ``wal2json`` (format-version 2) change into a change event."""
+    change = json.loads(line)
+    action = _ACTIONS.get(change.get("action"))
+    if action is None:
+        return None
+
+    def columns(key: str) -> dict:
+        return {
+            col["name"]: _normalize(col.get("type", ""), col.get("value"))
+            for col in change.get(key, [])
+        }
+
+    if action == "DELETE":
+        return _event(change["table"], action, columns("identity"))
+    old = columns("identity")
+    event = _event(change["table"], action, {**old, **columns("columns")})
+    if old:
+        event["old"] = old
+    return event
+
+
+def full_xid(xid: int, next_xid: int) -> int:
+    """Widen a 32-bit xid to the 64-bit form used in trigger payloads and snapshots.
+
+    The xid belongs to a transaction that started before ``next_xid``, so its
+    epoch is that of ``next_xid`` or the one before.
+    """
+    full = (next_xid >> 32 << 32) | xid
+    return full if full < next_xid else full - (1 << 32)
+
+
+class LogicalListener(PostgresListener):
+    """Captures table changes from a logical replication slot."""
+
+    def __init__(self, tables: dict[str, str] | None = None):
+        super().__init__()
+        # Table name -> channel, matching the channels the triggers notify on
+        self.tables = tables or {"items": "item_changes"}
+        self.slot_name = settings.logical_slot_name
+        self.plugin = settings.logical_plugin
+        self._channels: set[str] = set()
+
+    async def connect(self):
+        """Connect to PostgreSQL and make sure the replication slot exists."""
+        await super().connect()
+        exists = await self.connection.fetchval(
+            "SELECT 1 FROM pg_replication_slots WHERE slot_name = $1", self.slot_name
+        )
+        if not exists:
+            await self.connection.execute(
+                "SELECT pg_create_logical_replication_slot($1, $2)",
+                self.slot_name,
+                self.plugin,
+            )
+            print(f"✓ Created replication slot: {self.slot_name}")
+
+    async def listen(self, channel: str):
+        """Start delivering changes for tables mapped to ``channel``."""
+        if not self.connection:
+            await self.connect()
+
+        self._channels.add(channel)
+        print(f"✓ Listening on channel: {channel} (slot: {self.slot_name})")
+
+    def _options(self) -> list[str]:
+        if self.plugin == "wal2json":
+            return ["format-version", "2", "include-types", "1"]
+        return ["include-xids", "0", "skip-empty-xacts", "1"]
+
+    def _parse(self, line: str) -> tuple[bool, dict | None]:
+        """Return ``(is_commit, event)`` for one decoded row."""
+        if self.plugin == "wal2json":
+            if line.startswith('{"action":"C"'):
+                return True, None
+            return False, parse_wal2json(line)
+        if line.startswith("COMMIT"):
+            return True, None
+        return False, parse_test_decoding(line)
+
+    async def poll(self) -> int:
+        """Dispatch one batch of pending changes and confirm it.
+
+        Changes are peeked rather than consumed, and the slot is only advanced
+        past a transaction once its events have been dispatched, so a crash
+        re-delivers instead of losing changes.
+
+        Returns:
+            Number of rows read from the slot.
+        """
+        rows = await self.connection.fetch(
+            """
+            SELECT lsn::text AS lsn, xid::text::bigint AS xid, data,
+                   pg_snapshot_xmax(pg_current_snapshot())::text::bigint AS next_xid
+            FROM pg_logical_slot_peek_changes($1, NULL, $2, VARIADIC $3::text[])
+            """,
+            self.slot_name,
+            settings.logical_batch_size,
+            self._options(),
+        )
+
+        confirmed = None
+        for row in rows:
+            is_commit, event = self._parse(row["data"])
+            if is_commit:
+                confirmed = row["lsn"]
+                continue
+            if event is None:
+                continue
+            channel = self.tables.get(event["table"])
+            if channel in self._channels:
+                event["xid"] = full_xid(row["xid"], row["next_xid"])
+                await self._dispatch(channel, event)
+
+        if confirmed is not None:
+            await self.connection.execute(
+                "SELECT pg_replication_slot_advance($1, $2::text::pg_lsn)",
+                self.slot_name,
+                confirmed,
+            )
+        return len(rows)
+
+    async def start(self):
+        """Poll the replication slot until stopped."""
+        self._running = True
+        try:
+            while self._running:
+                try:
+                    read = await self.poll()
+                except Exception as e:
+                    print(f"Error reading replication slot {self.slot_name}: {e}")
+                    read = 0
+                # Keep draining without sleeping while there is a backlog
+                if read < settings.logical_batch_size:
+                    await asyncio.sleep(settings.logical_poll_interval)
+        except asyncio.CancelledError:
+            pass
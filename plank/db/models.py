@@ -20,6 +20,7 @@ class Item(BaseModel):
     value: int
     created_at: datetime
     updated_at: datetime
+    version: int
 
     class Config:
         from_attributes = True
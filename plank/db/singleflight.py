@@ -0,0 +1,42 @@
+"""Single-flight coalescing of identical concurrent reads."""
+
+import asyncio
+from collections.abc import Awaitable, Callable, Hashable
+
+
+class SingleFlight:
+    """Runs at most one call per key at a time and shares its result.
+
+    Callers asking for a key that is already in flight wait for that call
+    instead of starting their own. Nothing is cached: once the call finishes
+    the next caller runs it again, so a result is never older than a query
+    that was still running when the caller arrived.
+    """
+
+    def __init__(self):
+        self._inflight: dict[Hashable, asyncio.Task] = {}
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable]):
+        """Return the result of ``fn()``, shared with concurrent callers of ``key``."""
+        task = self._inflight.get(key)
+        if task is None or task.done():
+            task = asyncio.create_task(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+        # A cancelled caller must not cancel the flight for everyone else
+        return await asyncio.shield(task)
+
+    def forget_all(self):
+        """Stop sharing the calls in flight; later callers start fresh ones.
+
+        Callers already waiting still get their result. Use this when the
+        underlying data changed, since a running query may predate the change.
+        """
+        self._inflight.clear()
+
+    def _forget(self, key: Hashable, task: asyncio.Task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+
+    def __len__(self) -> int:
+        return len(self._inflight)
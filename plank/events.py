@@ -0,0 +1,57 @@
+"""Change events that keep the JSON text Postgres produced."""
+
+import json
+from collections.abc import Iterator, Mapping
+
+
+class RawEvent(Mapping):
+    """A NOTIFY payload that is decoded only when one of its fields is read.
+
+    Broadcasting, relaying and webhook delivery send ``raw`` as it is, so an
+    event nobody looks into is never parsed. Reading a field (``event["id"]``,
+    ``event.get("ts")``) parses the payload once and keeps the result. Only
+    text known to be JSON (trigger output, relay frames) should be wrapped;
+    should it turn out not to be, it is replaced by ``{"raw": ...}`` on
+    first read.
+    """
+
+    __slots__ = ("raw", "_data")
+
+    def __init__(self, raw: str):
+        self.raw = raw
+        self._data: dict | None = None
+
+    @property
+    def data(self) -> dict:
+        """The decoded payload."""
+        if self._data is None:
+            try:
+                self._data = json.loads(self.raw)
+            except json.JSONDecodeError:
+                self._data = {"raw": self.raw}
+                self.raw = json.dumps(self._data)
+        return self._data
+
+    @property
+    def decoded(self) -> bool:
+        """Whether the payload has been parsed yet."""
+        return self._data is not None
+
+    def __getitem__(self, key: str):
+        return self.data[key]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.data)
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+    def __repr__(self) -> str:
+        return f"RawEvent({self.raw!r})"
+
+
+def to_json(event: Mapping) -> str:
+    """Return an event as JSON text, reusing the raw payload when there is one."""
+    if isinstance(event, RawEvent):
+        return event.raw
+    return json.dumps(event)
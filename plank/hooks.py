@@ -0,0 +1,18 @@
+"""Instrumentation hook helpers.
+
+Components expose hooks as plain lists of callables (``db.on_query``,
+``listener.on_notify``/``on_dispatch``, ``manager.on_send``). Call sites check
+the list before doing any timing work, so an empty list costs one truthiness
+test per operation.
+"""
+
+from collections.abc import Callable
+
+
+def emit(hooks: list[Callable], *args):
+    """Call every hook with ``args``, isolating hook failures from the caller."""
+    for hook in hooks:
+        try:
+            hook(*args)
+        except Exception as e:
+            print(f"Error in hook {getattr(hook, '__name__', hook)}: {e}")
@@ -1,42 +1,158 @@
 """FastAPI application entry point."""
 
 import asyncio
+import json
+import signal
+import time
 from contextlib import asynccontextmanager
 from pathlib import Path
 
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect
+from fastapi import FastAPI, Request, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
-from fastapi.staticfiles import StaticFiles
+from fastapi.responses import JSONResponse
 
-from plank.api.routes import router
+from plank import tracing
+from plank.api.debug import router as debug_router
+from plank.api.routes import reads, router
 from plank.config import settings
+from plank.db.admission import OverloadedError, current_lane
+from plank.db.aggregates import item_aggregates
+from plank.db.batcher import item_batcher
 from plank.db.connection import db
-from plank.db.listener import listener
+from plank.db.listener import create_listener
+from plank.relay import RelayServer
+from plank.static import IndexPage, PrecompressedStaticFiles
+from plank.webhooks import WebhookDispatcher
 from plank.websocket.manager import manager
 
+# Change-capture backend selected in settings (NOTIFY triggers, logical decoding
+# or, on gateways, a relay node)
+listener = create_listener()
+
+# Relay nodes also stream their events to gateways
+relay = RelayServer() if settings.role == "relay" else None
+
+# Optional push of item changes to HTTP endpoints
+webhooks = WebhookDispatcher() if settings.webhook_urls else None
+
+
+def aggregates_message() -> dict:
+    """Build the message pushed to the ``aggregates`` topic."""
+    return {"type": "aggregates", "data": item_aggregates.snapshot()}
+
+
+async def refresh_aggregates():
+    """Reload the aggregates from the table and push them to subscribers."""
+    await item_aggregates.refresh()
+    if manager.subscriptions.get("aggregates"):
+        await manager.publish("aggregates", aggregates_message())
+
+
+def publish_aggregates(channel: str, data: dict):
+    """Apply a change to the aggregates and push them to subscribers."""
+    if item_aggregates.apply(data):
+        if manager.subscriptions.get("aggregates"):
+            asyncio.create_task(manager.publish("aggregates", aggregates_message()))
+    elif data.get("action") in ("UPDATE", "RESYNC"):
+        # The event can't be applied as a delta, so fall back to a reload
+        asyncio.create_task(refresh_aggregates())
+
+
+async def drain():
+    """Close WebSocket clients in paced waves with a staggered reconnect delay."""
+    await manager.drain(
+        waves=settings.drain_waves,
+        interval=settings.drain_wave_interval_ms / 1000,
+        max_delay=settings.reconnect_max_delay_ms / 1000,
+    )
+
+
+def drain_on_sigterm():
+    """Drain clients on SIGTERM before handing over to the server's own handler.
+
+    Uvicorn drops every open WebSocket before running lifespan shutdown, so
+    the drain has to start from the signal itself.
+    """
+    previous = signal.getsignal(signal.SIGTERM)
+    if not callable(previous):
+        return
+
+    loop = asyncio.get_running_loop()
+    tasks = set()
+
+    async def drain_then_exit(sig, frame):
+        try:
+            await drain()
+        finally:
+            previous(sig, frame)
+
+    def start_drain(sig, frame):
+        task = loop.create_task(drain_then_exit(sig, frame))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+
+    def handler(sig, frame):
+        if tasks or manager.draining:
+            # A second SIGTERM skips the remaining waves
+            previous(sig, frame)
+            return
+        loop.call_soon_threadsafe(start_drain, sig, frame)
+
+    signal.signal(signal.SIGTERM, handler)
+
+
+def subscribe_item_changes():
+    """Register the consumers of item change events with the listener."""
+    # Broadcast to WebSocket clients
+    listener.subscribe("item_changes", lambda channel, data: asyncio.create_task(manager.broadcast(data)))
+    # Reads still in flight may predate the change; don't let new callers join them
+    listener.subscribe("item_changes", lambda channel, data: reads.forget_all())
+    if settings.aggregates:
+        # The only default consumer that reads event fields
+        listener.subscribe("item_changes", publish_aggregates)
+    if relay:
+        listener.subscribe("item_changes", relay.publish)
+    if webhooks:
+        listener.subscribe("item_changes", webhooks.publish)
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Manage application lifecycle."""
-    # Startup
-    await db.connect()
-    await listener.connect()
+    # Startup: the pool and the listener connection are independent
+    started = time.perf_counter()
+    tracing.install(db, listener, manager)
+    await asyncio.gather(db.connect(), listener.connect())
 
-    # Subscribe to item changes and broadcast to WebSocket clients
-    listener.subscribe("item_changes", lambda channel, data: asyncio.create_task(manager.broadcast(data)))
+    subscribe_item_changes()
+    if relay:
+        await relay.start(settings.relay_host, settings.relay_port)
+    if webhooks:
+        await webhooks.start()
 
-    # Start listening to the channel
+    # Start listening to the channel, then load the aggregates so no change
+    # falls between their snapshot and the first event
     await listener.listen("item_changes")
+    if settings.aggregates:
+        await item_aggregates.refresh()
 
     # Create background task to keep listener alive
     listener_task = asyncio.create_task(listener.start())
 
+    drain_on_sigterm()
+    print(f"✓ Startup complete in {(time.perf_counter() - started) * 1000:.0f}ms")
+
     yield
 
-    # Shutdown
+    # Shutdown: clients go first, while the listener still feeds the ones left
+    await drain()
     listener_task.cancel()
     await listener.disconnect()
+    if relay:
+        await relay.stop()
+    if webhooks:
+        await webhooks.stop()
+    await item_batcher.flush()
     await db.disconnect()
 
 
@@ -56,23 +172,43 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+
+@app.middleware("http")
+async def admission_lane(request: Request, call_next):
+    """Queue reads behind writes for pool slots."""
+    current_lane.set("read" if request.method in ("GET", "HEAD") else "write")
+    return await call_next(request)
+
+
+@app.exception_handler(OverloadedError)
+async def overloaded_handler(request: Request, exc: OverloadedError):
+    """Shed load quickly instead of letting requests pile up."""
+    return JSONResponse(
+        {"detail": "Server overloaded, retry later"},
+        status_code=503,
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+
 # Include API routes
 app.include_router(router)
+app.include_router(debug_router)
 
 # Frontend static files
 FRONTEND_DIR = Path(__file__).parent.parent / "frontend" / "dist"
 
 # Mount static files (JS, CSS)
 if FRONTEND_DIR.exists():
-    app.mount("/static", StaticFiles(directory=FRONTEND_DIR), name="static")
+    app.mount("/static", PrecompressedStaticFiles(directory=FRONTEND_DIR), name="static")
+
+index_page = IndexPage(FRONTEND_DIR / "index.html")
 
 
 @app.get("/")
-async def index():
+async def index(request: Request):
     """Serve the frontend application."""
-    index_file = FRONTEND_DIR / "index.html"
-    if index_file.exists():
-        return FileResponse(index_file)
+    if index_page.exists():
+        return index_page.response(request.headers)
     else:
         # Fallback message if frontend hasn't been built
         return {
@@ -85,20 +221,48 @@ async def index():
 @app.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
     """WebSocket endpoint for real-time updates."""
+    if manager.draining:
+        # 1013 Try Again Later: this instance is shutting down
+        await websocket.close(code=1013)
+        return
+
     await manager.connect(websocket)
     try:
         while True:
             # Keep connection alive and receive messages
             data = await websocket.receive_text()
-            # Echo back for now (can add subscription logic here)
-            await manager.send_personal_message(
-                {"type": "echo", "message": data}, websocket
-            )
+            try:
+                message = json.loads(data)
+            except json.JSONDecodeError:
+                message = None
+
+            if isinstance(message, dict) and message.get("action") == "subscribe":
+                topic = message.get("topic")
+                manager.subscribe(websocket, topic)
+                if topic == "aggregates" and settings.aggregates:
+                    await manager.send_personal_message(aggregates_message(), websocket)
+            elif isinstance(message, dict) and message.get("action") == "unsubscribe":
+                manager.unsubscribe(websocket, message.get("topic"))
+            else:
+                # Echo back anything that isn't a subscription request
+                await manager.send_personal_message(
+                    {"type": "echo", "message": data}, websocket
+                )
     except WebSocketDisconnect:
         manager.disconnect(websocket)
 
 
 @app.get("/health")
 async def health():
-    """Health check endpoint."""
-    return {"status": "healthy", "database": "connected" if db.pool else "disconnected"}
+    """Health check endpoint.
+
+    Doesn't touch the pool, so it stays fast however busy the database is.
+    """
+    health = {
+        "status": "healthy",
+        "database": "connected" if db.pool else "disconnected",
+        "admission": db.admission.stats(),
+    }
+    if webhooks:
+        health["webhooks"] = webhooks.stats()
+    return health
@@ -0,0 +1,368 @@
+"""Event relay between listener nodes and WebSocket gateways.
+
+With ``ROLE=relay`` a node LISTENs to Postgres as usual and additionally
+streams every change event to gateway nodes over persistent TCP connections.
+Events are numbered, collected into short batches and each batch is encoded
+once and written as the same bytes to every gateway.
+
+With ``ROLE=gateway`` a node opens no LISTEN connection; ``RelayClient`` takes
+the listener's place and feeds events from a relay into the usual callbacks.
+
+Frames are a 4-byte big-endian length followed by a body. Hellos are JSON:
+
+- gateway hello: ``{"token", "epoch", "seq"}`` (last relay epoch and sequence seen)
+- relay hello: ``{"epoch", "seq", "oldest"}``
+
+Every later frame is a batch: the 8-byte sequence number of its first event and
+a 4-byte event count, then per event a 2-byte channel length, a 4-byte payload
+length, the channel name and the payload's JSON text. Payloads are copied in
+and out as they are, so neither side parses or re-encodes them. Heartbeats are
+batches with no events.
+
+A relay keeps recent events in memory, so a gateway that reconnects to the
+same relay gets what it missed. If events were lost (relay restarted, buffer
+overrun, switched relay) the gateway dispatches a ``RESYNC`` event instead.
+"""
+
+import asyncio
+import hmac
+import json
+import random
+import struct
+import uuid
+from collections import deque
+from collections.abc import Mapping
+
+from plank.config import settings
+from plank.db.listener import PostgresListener
+from plank.events import RawEvent, to_json
+
+_HEADER = struct.Struct(">I")
+_BATCH = struct.Struct(">QI")
+_EVENT = struct.Struct(">HI")
+MAX_FRAME_SIZE = 64 * 1024 * 1024
+
+
+def encode_frame(message: dict) -> bytes:
+    """Encode a message as a length-prefixed JSON frame."""
+    body = json.dumps(message, separators=(",", ":")).encode()
+    return _HEADER.pack(len(body)) + body
+
+
+def encode_batch(seq: int, events: list[tuple[str, Mapping]]) -> bytes:
+    """Encode a batch frame, copying in raw payloads without re-encoding them."""
+    parts = [_BATCH.pack(seq, len(events))]
+    for channel, data in events:
+        name = channel.encode()
+        payload = to_json(data).encode()
+        parts += (_EVENT.pack(len(name), len(payload)), name, payload)
+    body = b"".join(parts)
+    return _HEADER.pack(len(body)) + body
+
+
+def decode_batch(body: bytes) -> tuple[int, list[tuple[str, RawEvent]]]:
+    """Split a batch frame body into its first sequence number and events.
+
+    Raises:
+        ValueError: If the body is not a well-formed batch.
+    """
+    if len(body) < _BATCH.size:
+        raise ValueError("Relay batch too short")
+    seq, count = _BATCH.unpack_from(body)
+    offset = _BATCH.size
+    events = []
+    for _ in range(count):
+        if offset + _EVENT.size > len(body):
+            raise ValueError("Relay batch truncated")
+        name_length, payload_length = _EVENT.unpack_from(body, offset)
+        offset += _EVENT.size
+        end = offset + name_length + payload_length
+        if end > len(body):
+            raise ValueError("Relay batch truncated")
+        channel = body[offset:offset + name_length].decode()
+        events.append((channel, RawEvent(body[offset + name_length:end].decode())))
+        offset = end
+    if offset != len(body):
+        raise ValueError("Relay batch has trailing bytes")
+    return seq, events
+
+
+async def read_body(reader: asyncio.StreamReader) -> bytes:
+    """Read the body of one length-prefixed frame."""
+    (length,) = _HEADER.unpack(await reader.readexactly(_HEADER.size))
+    if length > MAX_FRAME_SIZE:
+        raise ValueError(f"Relay frame too large: {length} bytes")
+    return await reader.readexactly(length)
+
+
+async def read_frame(reader: asyncio.StreamReader) -> dict:
+    """Read one length-prefixed JSON frame."""
+    return json.loads(await read_body(reader))
+
+
+async def read_hello(reader: asyncio.StreamReader, fields: dict[str, type | tuple[type, ...]]) -> dict:
+    """Read a hello frame and check the type of each expected field.
+
+    Raises:
+        ValueError: If the frame is not an object with those fields.
+    """
+    hello = await read_frame(reader)
+    if not isinstance(hello, dict) or not all(
+        isinstance(hello.get(name), kind) for name, kind in fields.items()
+    ):
+        raise ValueError(f"Malformed relay hello: {hello!r:.200}")
+    return hello
+
+
+class RelayServer:
+    """Streams sequenced event batches from this node's listener to gateways."""
+
+    def __init__(
+        self,
+        batch_window: float | None = None,
+        batch_max: int | None = None,
+        buffer_size: int | None = None,
+        heartbeat: float | None = None,
+        token: str | None = None,
+        max_buffered_bytes: int = 16 * 1024 * 1024,
+    ):
+        self.batch_window = settings.relay_batch_ms / 1000 if batch_window is None else batch_window
+        self.batch_max = settings.relay_batch_max if batch_max is None else batch_max
+        self.heartbeat = settings.relay_heartbeat_s if heartbeat is None else heartbeat
+        self.token = settings.relay_token if token is None else token
+        self.max_buffered_bytes = max_buffered_bytes
+
+        # Identifies this relay's sequence space; changes on every restart
+        self.epoch = uuid.uuid4().hex
+        self.seq = 0
+        self.buffer: deque[tuple[int, str, Mapping]] = deque(
+            maxlen=settings.relay_buffer_size if buffer_size is None else buffer_size
+        )
+        self.gateways: set[asyncio.StreamWriter] = set()
+        self._pending: list[tuple[int, str, Mapping]] = []
+        self._flush_handle: asyncio.TimerHandle | None = None
+        self._server: asyncio.Server | None = None
+        self._heartbeat_task: asyncio.Task | None = None
+
+    @property
+    def port(self) -> int | None:
+        """Port the relay is bound to."""
+        if not self._server or not self._server.sockets:
+            return None
+        return self._server.sockets[0].getsockname()[1]
+
+    async def start(self, host: str, port: int):
+        """Start accepting gateway connections."""
+        if not self.token:
+            # An empty token would let anyone who reaches the port read every change
+            raise RuntimeError("ROLE=relay needs a RELAY_TOKEN shared with the gateways")
+
+        self._server = await asyncio.start_server(self._handle_gateway, host, port)
+        self._heartbeat_task = asyncio.create_task(self._send_heartbeats())
+        print(f"✓ Relay listening on {host}:{self.port}")
+
+    async def stop(self):
+        """Flush pending events and close all gateway connections."""
+        self._flush()
+        if self._heartbeat_task:
+            self._heartbeat_task.cancel()
+        if self._server:
+            self._server.close()
+        for writer in list(self.gateways):
+            self._drop(writer)
+        if self._server:
+            await self._server.wait_closed()
+            print("✓ Relay closed")
+
+    def publish(self, channel: str, data: Mapping):
+        """Listener callback: number an event and queue it for the next batch."""
+        self.seq += 1
+        event = (self.seq, channel, data)
+        self.buffer.append(event)
+        self._pending.append(event)
+
+        if len(self._pending) >= self.batch_max:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = asyncio.get_running_loop().call_later(
+                self.batch_window, self._flush
+            )
+
+    def _flush(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        if not self._pending:
+            return
+
+        batch, self._pending = self._pending, []
+        frame = encode_batch(batch[0][0], [(channel, data) for _, channel, data in batch])
+        self._send_all(frame)
+
+    def _send_all(self, frame: bytes):
+        for writer in list(self.gateways):
+            # Never wait on a gateway; one that can't keep up is dropped and
+            # catches up from the buffer when it reconnects
+            if writer.transport.get_write_buffer_size() > self.max_buffered_bytes:
+                print("Relay: dropping gateway that is not keeping up")
+                self._drop(writer)
+                continue
+            writer.write(frame)
+
+    def _drop(self, writer: asyncio.StreamWriter):
+        self.gateways.discard(writer)
+        writer.close()
+
+    async def _send_heartbeats(self):
+        while True:
+            await asyncio.sleep(self.heartbeat)
+            self._flush()
+            self._send_all(encode_batch(self.seq + 1, []))
+
+    async def _handle_gateway(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        peer = writer.get_extra_info("peername")
+        try:
+            hello = await asyncio.wait_for(
+                read_hello(reader, {"token": str, "epoch": (str, type(None)), "seq": int}), timeout=10
+            )
+            if not hmac.compare_digest(hello["token"], self.token):
+                print(f"Relay: rejected gateway {peer} (bad token)")
+                writer.close()
+                return
+
+            # Everything below runs without awaiting, so no event can slip
+            # between the replay and the gateway joining the live stream
+            self._flush()
+            oldest = self.buffer[0][0] if self.buffer else self.seq + 1
+            writer.write(encode_frame({"epoch": self.epoch, "seq": self.seq, "oldest": oldest}))
+            last_seq = hello["seq"]
+            if hello["epoch"] == self.epoch and last_seq + 1 >= oldest:
+                missed = [event for event in self.buffer if event[0] > last_seq]
+                if missed:
+                    writer.write(encode_batch(
+                        missed[0][0], [(channel, data) for _, channel, data in missed]
+                    ))
+            self.gateways.add(writer)
+            print(f"✓ Relay gateway connected: {peer} (total: {len(self.gateways)})")
+
+            # Gateways don't send anything after the hello; wait for them to go away
+            while await reader.read(1024):
+                pass
+        except (OSError, asyncio.IncompleteReadError, ValueError) as e:
+            print(f"Relay: gateway {peer} error: {e}")
+        finally:
+            if writer in self.gateways:
+                self._drop(writer)
+                print(f"✓ Relay gateway disconnected: {peer} (total: {len(self.gateways)})")
+            else:
+                writer.close()
+
+
+class RelayClient(PostgresListener):
+    """Receives change events from a relay node instead of LISTENing to Postgres."""
+
+    def __init__(
+        self,
+        relays: list[str] | None = None,
+        heartbeat: float | None = None,
+        token: str | None = None,
+    ):
+        super().__init__()
+        self.relays = list(relays or settings.relay_urls)
+        self.heartbeat = settings.relay_heartbeat_s if heartbeat is None else heartbeat
+        self.token = settings.relay_token if token is None else token
+        self.epoch: str | None = None
+        self.last_seq = 0
+        self._channels: set[str] = set()
+        self._writer: asyncio.StreamWriter | None = None
+
+    async def connect(self):
+        """Nothing to open up front; ``start`` connects and reconnects to relays."""
+        print(f"✓ Gateway mode, relays: {', '.join(self.relays)}")
+
+    async def disconnect(self):
+        """Close the relay connection."""
+        self._running = False
+        if self._writer:
+            self._writer.close()
+            print("✓ Relay connection closed")
+
+    async def listen(self, channel: str):
+        """Start delivering relayed events for a channel."""
+        self._channels.add(channel)
+        print(f"✓ Listening on channel: {channel} (via relay)")
+
+    async def _open(self) -> asyncio.StreamReader:
+        # Spread gateways over the relays instead of all piling onto the first
+        for relay in random.sample(self.relays, len(self.relays)):
+            host, _, port = relay.rpartition(":")
+            writer = None
+            try:
+                reader, writer = await asyncio.wait_for(
+                    asyncio.open_connection(host, int(port)), timeout=5
+                )
+                writer.write(encode_frame({
+                    "token": self.token,
+                    "epoch": self.epoch,
+                    "seq": self.last_seq,
+                }))
+                hello = await asyncio.wait_for(
+                    read_hello(reader, {"epoch": str, "seq": int, "oldest": int}), timeout=5
+                )
+            except (OSError, asyncio.IncompleteReadError, ValueError) as e:
+                print(f"Relay {relay} unavailable: {e}")
+                if writer:
+                    writer.close()
+                continue
+
+            resumed = hello["epoch"] == self.epoch and self.last_seq + 1 >= hello["oldest"]
+            if not resumed:
+                if self.epoch is not None:
+                    await self._resync()
+                self.epoch = hello["epoch"]
+                self.last_seq = hello["seq"]
+            self._writer = writer
+            print(f"✓ Connected to relay {relay} ({'resumed' if resumed else 'new stream'})")
+            return reader
+
+        raise ConnectionError("No relay reachable")
+
+    async def _resync(self):
+        """Tell consumers that events were lost and state must be reloaded."""
+        for channel in self._channels:
+            await self._dispatch(channel, {"action": "RESYNC"})
+
+    async def _consume(self, reader: asyncio.StreamReader):
+        while self._running:
+            body = await asyncio.wait_for(read_body(reader), timeout=self.heartbeat * 3)
+            seq, events = decode_batch(body)
+            if seq > self.last_seq + 1:
+                await self._resync()
+            for offset, (channel, data) in enumerate(events):
+                if seq + offset <= self.last_seq:
+                    # Already seen (overlapping replay)
+                    continue
+                self.last_seq = seq + offset
+                if channel in self._channels:
+                    await self._dispatch(channel, data)
+
+    async def start(self):
+        """Consume relayed events, reconnecting with jittered backoff."""
+        self._running = True
+        delay = 0.5
+        try:
+            while self._running:
+                try:
+                    reader = await self._open()
+                    delay = 0.5
+                    await self._consume(reader)
+                except (OSError, asyncio.IncompleteReadError, ValueError) as e:
+                    print(f"Relay connection lost: {e}")
+                finally:
+                    if self._writer:
+                        self._writer.close()
+                        self._writer = None
+                await asyncio.sleep(delay * random.uniform(0.5, 1.5))
+                delay = min(delay * 2, 10)
+        except asyncio.CancelledError:
+            pass
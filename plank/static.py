@@ -0,0 +1,153 @@
+"""Static frontend serving with precompressed variants and cache headers."""
+
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+from pathlib import Path
+
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+from starlette.types import Scope
+
+# Precompressed variants written by frontend/build.ts, in order of preference
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+
+# Content-hashed names from the build, e.g. bundle-a1b2c3d4.js
+_HASHED_NAME = re.compile(r"-(?=[a-z]*\d)[a-z0-9]{8,}\.")
+
+
+def accepted_encodings(headers: Headers) -> set[str]:
+    """Return the content codings a client accepts (q=0 excluded)."""
+    accepted = set()
+    for part in headers.get("accept-encoding", "").split(","):
+        coding, _, params = part.strip().partition(";")
+        params = params.replace(" ", "")
+        if coding and params not in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            accepted.add(coding.lower())
+    return accepted
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """Return True if an If-None-Match list names ``etag`` (weakly) or is ``*``."""
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+class PrecompressedStaticFiles(StaticFiles):
+    """StaticFiles that serves ``.br``/``.gz`` siblings and sets cache headers.
+
+    Hashed build assets are marked immutable; everything else must be
+    revalidated. Compression happens at build time, so serving a request is
+    just a ``stat`` and a file send.
+    """
+
+    def file_response(
+        self,
+        full_path,
+        stat_result: os.stat_result,
+        scope: Scope,
+        status_code: int = 200,
+    ) -> Response:
+        request_headers = Headers(scope=scope)
+        name = os.path.basename(full_path)
+        headers = {
+            "Cache-Control": IMMUTABLE if _HASHED_NAME.search(name) else REVALIDATE,
+            "Vary": "Accept-Encoding",
+        }
+
+        path, encoding = full_path, None
+        accepted = accepted_encodings(request_headers)
+        for coding, suffix in ENCODINGS:
+            if coding in accepted:
+                try:
+                    stat_result = os.stat(f"{full_path}{suffix}")
+                except OSError:
+                    continue
+                path, encoding = f"{full_path}{suffix}", coding
+                break
+
+        if encoding:
+            headers["Content-Encoding"] = encoding
+        response = FileResponse(
+            path,
+            status_code=status_code,
+            stat_result=stat_result,
+            headers=headers,
+            media_type=mimetypes.guess_type(name)[0] or "text/plain",
+        )
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+        return response
+
+
+class IndexPage:
+    """Keeps ``index.html`` in memory with an ETag, reloading it when it changes.
+
+    The ``.br``/``.gz`` siblings written by the build are served when they are
+    at least as new as the page; without a prebuilt ``.gz`` the page is gzipped
+    in memory. Each encoding is a different representation with its own ETag.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._mtimes: tuple | None = None
+        # Content coding (None for identity) -> (body, ETag)
+        self._variants: dict[str | None, tuple[bytes, str]] = {}
+        self.etag = ""
+
+    def exists(self) -> bool:
+        """Return True if the page is available on disk."""
+        return self.path.exists()
+
+    def _sibling(self, suffix: str) -> Path:
+        return self.path.with_name(self.path.name + suffix)
+
+    def _refresh(self):
+        mtimes = [self.path.stat().st_mtime_ns]
+        for _, suffix in ENCODINGS:
+            try:
+                mtimes.append(self._sibling(suffix).stat().st_mtime_ns)
+            except OSError:
+                mtimes.append(None)
+        if tuple(mtimes) == self._mtimes:
+            return
+
+        body = self.path.read_bytes()
+        digest = hashlib.md5(body, usedforsecurity=False).hexdigest()
+        self.etag = f'"{digest}"'
+        variants = {None: (body, self.etag)}
+        for (coding, suffix), mtime in zip(ENCODINGS, mtimes[1:], strict=True):
+            # An older sibling belongs to a previous build
+            if mtime is not None and mtime >= mtimes[0]:
+                variants[coding] = (self._sibling(suffix).read_bytes(), f'"{digest}-{coding}"')
+        if "gzip" not in variants:
+            variants["gzip"] = (gzip.compress(body), f'"{digest}-gzip"')
+        self._variants = variants
+        self._mtimes = tuple(mtimes)
+
+    def response(self, request_headers: Headers) -> Response:
+        """Build a response for the page, honouring If-None-Match and Accept-Encoding."""
+        self._refresh()
+        headers = {"Cache-Control": REVALIDATE, "Vary": "Accept-Encoding"}
+        accepted = accepted_encodings(request_headers)
+        coding = next(
+            (coding for coding, _ in ENCODINGS if coding in accepted and coding in self._variants),
+            None,
+        )
+        body, etag = self._variants[coding]
+        headers["ETag"] = etag
+        if etag_matches(request_headers.get("if-none-match", ""), etag):
+            return Response(status_code=304, headers=headers)
+
+        if coding:
+            headers["Content-Encoding"] = coding
+        return Response(body, media_type="text/html", headers=headers)
@@ -0,0 +1,126 @@
+"""Built-in tracing, slow-query logging and CPU profiling on top of the hooks."""
+
+import asyncio
+import cProfile
+import io
+import pstats
+import random
+from collections import OrderedDict, deque
+
+from plank.config import settings
+
+STAGES = ("db_to_listener", "dispatch", "queued", "send", "total")
+
+
+class Tracer:
+    """Samples change events and times each stage from trigger to socket write.
+
+    The trigger stamps ``ts`` with ``clock_timestamp()``; the listener and
+    connection manager hooks add receipt, dispatch and send times for the
+    same event object. All times are wall-clock seconds, so the first stage
+    assumes database and application clocks are in sync.
+    """
+
+    def __init__(self, sample_rate: float, max_traces: int = 200, max_pending: int = 1000):
+        self.sample_rate = sample_rate
+        self.traces: deque[dict] = deque(maxlen=max_traces)
+        self.max_pending = max_pending
+        # id(event) -> partial trace, for events dispatched but not yet sent
+        self._pending: OrderedDict[int, dict] = OrderedDict()
+
+    def on_dispatch(self, channel: str, data: dict, received: float, finished: float):
+        """Listener hook: start a trace for a sampled event."""
+        if random.random() >= self.sample_rate:
+            return
+        self._pending[id(data)] = {
+            "channel": channel,
+            "action": data.get("action"),
+            "id": data.get("id"),
+            "ts": data.get("ts"),
+            "received": received,
+            "dispatched": finished,
+        }
+        if len(self._pending) > self.max_pending:
+            self._pending.popitem(last=False)
+
+    def on_send(self, message: dict, recipients: int, started: float, finished: float):
+        """Manager hook: complete the trace once the event reached the sockets."""
+        trace = self._pending.pop(id(message), None)
+        if trace is None:
+            return
+
+        ts = trace.pop("ts")
+        received = trace.pop("received")
+        dispatched = trace.pop("dispatched")
+        stages = {
+            "db_to_listener": received - ts if ts is not None else None,
+            "dispatch": dispatched - received,
+            "queued": started - dispatched,
+            "send": finished - started,
+            "total": finished - (ts if ts is not None else received),
+        }
+        trace["recipients"] = recipients
+        trace["stages_ms"] = {
+            name: round(value * 1000, 3) if value is not None else None
+            for name, value in stages.items()
+        }
+        self.traces.append(trace)
+
+    def summary(self) -> dict:
+        """Return mean and max per stage over the retained traces."""
+        result = {}
+        for stage in STAGES:
+            values = [t["stages_ms"][stage] for t in self.traces if t["stages_ms"][stage] is not None]
+            if values:
+                result[stage] = {"mean_ms": round(sum(values) / len(values), 3), "max_ms": max(values)}
+        return result
+
+
+class SlowQueryLog:
+    """Logs queries slower than a threshold."""
+
+    def __init__(self, threshold_ms: float):
+        self.threshold = threshold_ms / 1000
+
+    def __call__(self, query: str, args: tuple, started: float, finished: float):
+        duration = finished - started
+        if duration >= self.threshold:
+            print(f"⚠ Slow query ({duration * 1000:.1f}ms): {' '.join(query.split())} {args!r}")
+
+
+_profile_lock = asyncio.Lock()
+
+
+async def profile(seconds: float, limit: int = 40, sort: str = "cumulative") -> str:
+    """Profile the event loop thread for ``seconds`` and return a pstats report.
+
+    Everything the loop runs while this coroutine sleeps is captured, which
+    covers request handling, listener callbacks and WebSocket sends.
+    """
+    async with _profile_lock:
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            profiler.disable()
+
+    out = io.StringIO()
+    pstats.Stats(profiler, stream=out).sort_stats(sort).print_stats(limit)
+    return out.getvalue()
+
+
+tracer: Tracer | None = None
+
+
+def install(db, listener, manager):
+    """Attach the tracing features enabled in settings to the pipeline components."""
+    global tracer
+    if settings.trace_sample_rate > 0:
+        tracer = Tracer(settings.trace_sample_rate)
+        listener.on_dispatch.append(tracer.on_dispatch)
+        manager.on_send.append(tracer.on_send)
+        print(f"✓ Tracing {settings.trace_sample_rate:.0%} of change events")
+    if settings.slow_query_ms > 0:
+        db.on_query.append(SlowQueryLog(settings.slow_query_ms))
+        print(f"✓ Logging queries slower than {settings.slow_query_ms}ms")
@@ -0,0 +1,200 @@
+"""Batched webhook delivery of change events.
+
+Every configured endpoint gets its own bounded queue, fed synchronously from
+listener callbacks, and its own worker that POSTs batches of events:
+
+    {"events": [...], "dropped": 0}
+
+A batch is sent once it holds ``batch_size`` events or ``batch_window`` after
+its first event, whichever comes first. Batches to one endpoint go out one at
+a time and in order, over a shared keep-alive connection pool, with at most
+``concurrency`` requests in flight across all endpoints. Failed deliveries
+(connection errors, 429 and 5xx) are retried with exponential backoff.
+
+Nothing here ever waits on the listener or WebSocket path: when an endpoint
+falls so far behind that its queue is full, the oldest events are dropped and
+the next batch reports how many in ``dropped`` so the receiver can resync.
+Events of a batch that was given up on (retries exhausted, or a 4xx) are
+counted in ``dropped`` the same way.
+Batches are signed with HMAC-SHA256 in ``X-Plank-Signature`` when a secret is
+configured.
+
+Needs httpx (``pip install 'plank[webhooks]'``).
+"""
+
+import asyncio
+import contextlib
+import hashlib
+import hmac
+import random
+from collections import deque
+from collections.abc import Mapping
+
+from plank.config import settings
+from plank.events import to_json
+
+try:
+    import httpx
+except ImportError:  # optional "webhooks" extra
+    httpx = None
+
+
+class WebhookEndpoint:
+    """Pending events and delivery counters for one URL."""
+
+    def __init__(self, url: str, queue_size: int, batch_size: int):
+        self.url = url
+        self.batch_size = batch_size
+        self.queue: deque[Mapping] = deque(maxlen=queue_size)
+        self.dropped = 0
+        self.delivered = 0
+        self.failed = 0
+        # Set when there is anything to send / a full batch to send
+        self.ready = asyncio.Event()
+        self.full = asyncio.Event()
+
+    def push(self, event: Mapping):
+        if len(self.queue) == self.queue.maxlen:
+            self.dropped += 1
+        self.queue.append(event)
+        self.ready.set()
+        if len(self.queue) >= self.batch_size:
+            self.full.set()
+
+    def take(self) -> tuple[list[Mapping], int]:
+        """Remove the next batch and the number of events dropped before it."""
+        batch = [self.queue.popleft() for _ in range(min(self.batch_size, len(self.queue)))]
+        dropped, self.dropped = self.dropped, 0
+        if not self.queue:
+            self.ready.clear()
+        if len(self.queue) < self.batch_size:
+            self.full.clear()
+        return batch, dropped
+
+    def stats(self) -> dict:
+        return {
+            "queued": len(self.queue),
+            "delivered": self.delivered,
+            "failed": self.failed,
+        }
+
+
+class WebhookDispatcher:
+    """Delivers change events to HTTP endpoints in batches."""
+
+    def __init__(
+        self,
+        urls: list[str] | None = None,
+        batch_size: int | None = None,
+        batch_window: float | None = None,
+        queue_size: int | None = None,
+        concurrency: int | None = None,
+        max_retries: int | None = None,
+        retry_base: float | None = None,
+        timeout: float | None = None,
+        secret: str | None = None,
+    ):
+        self.batch_window = settings.webhook_batch_ms / 1000 if batch_window is None else batch_window
+        self.concurrency = settings.webhook_concurrency if concurrency is None else concurrency
+        self.max_retries = settings.webhook_max_retries if max_retries is None else max_retries
+        self.retry_base = settings.webhook_retry_base_ms / 1000 if retry_base is None else retry_base
+        self.timeout = settings.webhook_timeout_s if timeout is None else timeout
+        self.secret = settings.webhook_secret if secret is None else secret
+
+        batch_size = settings.webhook_batch_size if batch_size is None else batch_size
+        queue_size = settings.webhook_queue_size if queue_size is None else queue_size
+        self.endpoints = [
+            WebhookEndpoint(url, queue_size, batch_size)
+            for url in (settings.webhook_urls if urls is None else urls)
+        ]
+
+        self._client = None
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        self._workers: list[asyncio.Task] = []
+        self._stopping = False
+
+    def publish(self, channel: str, data: Mapping):
+        """Listener callback: queue an event for every endpoint."""
+        for endpoint in self.endpoints:
+            endpoint.push(data)
+
+    async def start(self):
+        """Open the connection pool and start one worker per endpoint."""
+        if httpx is None:
+            raise RuntimeError("Webhooks need httpx: pip install 'plank[webhooks]'")
+
+        self._client = httpx.AsyncClient(
+            timeout=self.timeout,
+            limits=httpx.Limits(
+                max_connections=self.concurrency,
+                max_keepalive_connections=self.concurrency,
+            ),
+        )
+        self._workers = [asyncio.create_task(self._run(endpoint)) for endpoint in self.endpoints]
+        print(f"✓ Webhooks delivering to {len(self.endpoints)} endpoint(s)")
+
+    async def stop(self, timeout: float = 5.0):
+        """Send what is still queued, within ``timeout``, then close the pool."""
+        self._stopping = True
+        for endpoint in self.endpoints:
+            endpoint.ready.set()
+            endpoint.full.set()
+
+        if self._workers:
+            _, pending = await asyncio.wait(self._workers, timeout=timeout)
+            for worker in pending:
+                worker.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+        if self._client:
+            await self._client.aclose()
+            print("✓ Webhooks stopped")
+
+    async def _run(self, endpoint: WebhookEndpoint):
+        while not (self._stopping and not endpoint.queue):
+            await endpoint.ready.wait()
+            if not endpoint.full.is_set() and not self._stopping:
+                # Give the batch a moment to fill up
+                with contextlib.suppress(TimeoutError):
+                    await asyncio.wait_for(endpoint.full.wait(), self.batch_window)
+
+            batch, dropped = endpoint.take()
+            if batch:
+                await self._deliver(endpoint, batch, dropped)
+
+    async def _deliver(self, endpoint: WebhookEndpoint, batch: list[Mapping], dropped: int):
+        events = ",".join(to_json(event) for event in batch)
+        body = f'{{"events":[{events}],"dropped":{dropped}}}'.encode()
+        headers = {"Content-Type": "application/json"}
+        if self.secret:
+            signature = hmac.new(self.secret.encode(), body, hashlib.sha256).hexdigest()
+            headers["X-Plank-Signature"] = f"sha256={signature}"
+
+        error = None
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                delay = min(self.retry_base * 2 ** (attempt - 1), 30)
+                await asyncio.sleep(delay * random.uniform(0.5, 1.0))
+            try:
+                async with self._semaphore:
+                    response = await self._client.post(endpoint.url, content=body, headers=headers)
+            except httpx.HTTPError as e:
+                error = str(e) or type(e).__name__
+                continue
+
+            if response.is_success:
+                endpoint.delivered += len(batch)
+                return
+            error = f"HTTP {response.status_code}"
+            if response.status_code != 429 and response.status_code < 500:
+                # The endpoint rejected the batch; sending it again won't help
+                break
+
+        endpoint.failed += len(batch)
+        # The receiver never saw these, nor the drop count this batch carried;
+        # tell it with the next batch
+        endpoint.dropped += len(batch) + dropped
+        print(f"Webhook {endpoint.url}: giving up on {len(batch)} events ({error})")
+
+    def stats(self) -> dict:
+        """Queue length and delivery counters per endpoint."""
+        return {endpoint.url: endpoint.stats() for endpoint in self.endpoints}
@@ -1,15 +1,35 @@
 """WebSocket connection manager."""
 
+import asyncio
 import json
+import math
+import random
+import time
+from collections.abc import Mapping
+from typing import TYPE_CHECKING
 
 from fastapi import WebSocket
 
+from plank.events import to_json
+from plank.hooks import emit
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
 
 class ConnectionManager:
     """Manages WebSocket connections and broadcasts."""
 
     def __init__(self):
         self.active_connections: list[WebSocket] = []
+        self.subscriptions: dict[str, set[WebSocket]] = {}
+        # Called as hook(message, recipients, started_at, finished_at) after each fan-out
+        self.on_send: list[Callable] = []
+        # Set once shutdown starts; new connections are turned away
+        self.draining = False
+        # Last change event broadcast; its trigger timestamp is the resume point,
+        # read only when needed so broadcasting never has to decode an event
+        self._last_event: Mapping | None = None
 
     async def connect(self, websocket: WebSocket):
         """Accept and register a new WebSocket connection."""
@@ -19,20 +39,84 @@ class ConnectionManager:
 
     def disconnect(self, websocket: WebSocket):
         """Remove a WebSocket connection."""
+        for subscribers in self.subscriptions.values():
+            subscribers.discard(websocket)
         if websocket in self.active_connections:
             self.active_connections.remove(websocket)
             print(f"✓ WebSocket disconnected (total: {len(self.active_connections)})")
 
+    def subscribe(self, websocket: WebSocket, topic: str):
+        """Subscribe a WebSocket to a topic."""
+        self.subscriptions.setdefault(topic, set()).add(websocket)
+
+    def unsubscribe(self, websocket: WebSocket, topic: str):
+        """Unsubscribe a WebSocket from a topic."""
+        self.subscriptions.get(topic, set()).discard(websocket)
+
+    async def publish(self, topic: str, message: dict):
+        """Send a message to the WebSockets subscribed to a topic."""
+        subscribers = self.subscriptions.get(topic)
+        if subscribers:
+            await self._send_all(list(subscribers), message)
+
     async def send_personal_message(self, message: dict, websocket: WebSocket):
         """Send a message to a specific WebSocket."""
         await websocket.send_text(json.dumps(message))
 
-    async def broadcast(self, message: dict):
+    async def broadcast(self, message: Mapping):
         """Broadcast a message to all connected WebSockets."""
+        self._last_event = message
+        await self._send_all(list(self.active_connections), message)
+
+    @property
+    def last_event_ts(self) -> float | None:
+        """Trigger timestamp of the last broadcast event, if it carried one."""
+        return self._last_event.get("ts") if self._last_event is not None else None
+
+    async def drain(self, waves: int, interval: float, max_delay: float):
+        """Close every connection in paced waves, telling clients when to come back.
+
+        Each client gets a ``reconnect`` message with a randomized delay and
+        the resume point before its socket is closed with 1012 (Service
+        Restart), so a rolling deploy doesn't turn into one reconnect spike.
+
+        Args:
+            waves: Number of groups the connections are closed in.
+            interval: Seconds between waves.
+            max_delay: Upper bound in seconds for the reconnect delay sent to clients.
+        """
+        self.draining = True
+        connections = list(self.active_connections)
+        if not connections:
+            return
+
+        random.shuffle(connections)
+        size = math.ceil(len(connections) / max(waves, 1))
+        print(f"✓ Draining {len(connections)} WebSocket(s) in waves of {size}")
+        for start in range(0, len(connections), size):
+            if start:
+                await asyncio.sleep(interval)
+            for websocket in connections[start:start + size]:
+                message = {
+                    "type": "reconnect",
+                    "delay_ms": random.randint(0, int(max_delay * 1000)),
+                    "resume": {"ts": self.last_event_ts},
+                }
+                try:
+                    await websocket.send_text(json.dumps(message))
+                    await websocket.close(code=1012)
+                except Exception as e:
+                    print(f"Error closing client: {e}")
+                self.disconnect(websocket)
+
+    async def _send_all(self, connections: list[WebSocket], message: Mapping):
+        """Encode a message once and send it to each connection."""
+        started = time.time() if self.on_send else 0.0
+        text = to_json(message)
         disconnected = []
-        for connection in self.active_connections:
+        for connection in connections:
             try:
-                await connection.send_text(json.dumps(message))
+                await connection.send_text(text)
             except Exception as e:
                 print(f"Error sending to client: {e}")
                 disconnected.append(connection)
@@ -41,6 +125,9 @@ class ConnectionManager:
         for conn in disconnected:
             self.disconnect(conn)
 
+        if self.on_send:
+            emit(self.on_send, message, len(connections), started, time.time())
+
 
 # Global connection manager instance
 manager = ConnectionManager()
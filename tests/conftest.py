@@ -7,6 +7,8 @@ import asyncpg
 import pytest
 import pytest_asyncio
 
+from plank.db.init import create_schema
+
 # Use a test database URL - can be overridden with TEST_DATABASE_URL env var
 TEST_DATABASE_URL = os.getenv(
     "TEST_DATABASE_URL",
@@ -42,78 +44,7 @@ async def init_test_database(test_db_url):
     conn = await asyncpg.connect(test_db_url)
 
     try:
-        # Create items table
-        await conn.execute("""
-            CREATE TABLE IF NOT EXISTS items (
-                id SERIAL PRIMARY KEY,
-                name VARCHAR(255) NOT NULL,
-                value INTEGER NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            );
-        """)
-
-        # Create notification function
-        await conn.execute("""
-            CREATE OR REPLACE FUNCTION notify_item_changes()
-            RETURNS TRIGGER AS $$
-            DECLARE
-                payload JSON;
-            BEGIN
-                IF (TG_OP = 'DELETE') THEN
-                    payload = json_build_object(
-                        'table', TG_TABLE_NAME,
-                        'action', TG_OP,
-                        'id', OLD.id,
-                        'data', row_to_json(OLD)
-                    );
-                ELSE
-                    payload = json_build_object(
-                        'table', TG_TABLE_NAME,
-                        'action', TG_OP,
-                        'id', NEW.id,
-                        'data', row_to_json(NEW)
-                    );
-                END IF;
-
-                PERFORM pg_notify('item_changes', payload::text);
-
-                IF (TG_OP = 'DELETE') THEN
-                    RETURN OLD;
-                ELSE
-                    RETURN NEW;
-                END IF;
-            END;
-            $$ LANGUAGE plpgsql;
-        """)
-
-        # Create trigger
-        await conn.execute("""
-            DROP TRIGGER IF EXISTS items_notify_trigger ON items;
-            CREATE TRIGGER items_notify_trigger
-            AFTER INSERT OR UPDATE OR DELETE ON items
-            FOR EACH ROW EXECUTE FUNCTION notify_item_changes();
-        """)
-
-        # Create update timestamp function
-        await conn.execute("""
-            CREATE OR REPLACE FUNCTION update_updated_at_column()
-            RETURNS TRIGGER AS $$
-            BEGIN
-                NEW.updated_at = CURRENT_TIMESTAMP;
-                RETURN NEW;
-            END;
-            $$ LANGUAGE plpgsql;
-        """)
-
-        # Create update timestamp trigger
-        await conn.execute("""
-            DROP TRIGGER IF EXISTS update_items_updated_at ON items;
-            CREATE TRIGGER update_items_updated_at
-            BEFORE UPDATE ON items
-            FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
-        """)
-
+        await create_schema(conn)
         print("✓ Initialized test database schema")
 
     finally:
@@ -0,0 +1,102 @@
+"""Tests for admission control on the connection pool."""
+
+import asyncio
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+
+from plank.db.admission import Admission, OverloadedError
+from plank.db.connection import db
+from plank.main import app
+
+
+def make_admission(**kwargs) -> Admission:
+    options = {"slots": 1, "max_waiting": {"system": 10, "write": 10, "read": 10}, "timeout": 1.0, "retry_after": 3}
+    options.update(kwargs)
+    return Admission(**options)
+
+
+@pytest.mark.asyncio
+async def test_waiters_are_served_by_lane_priority():
+    """Test that a freed slot goes to writes before reads queued earlier."""
+    admission = make_admission()
+    order = []
+
+    async def query(lane, name):
+        async with admission.slot(lane):
+            order.append(name)
+
+    await admission.acquire("read")
+    tasks = [
+        asyncio.create_task(query("read", "read-1")),
+        asyncio.create_task(query("read", "read-2")),
+        asyncio.create_task(query("write", "write")),
+        asyncio.create_task(query("system", "system")),
+    ]
+    await asyncio.sleep(0)
+    admission.release()
+    await asyncio.gather(*tasks)
+
+    assert order == ["system", "write", "read-1", "read-2"]
+    assert admission.in_use == 0
+
+
+@pytest.mark.asyncio
+async def test_full_queue_fails_fast():
+    """Test that a lane with a full wait queue rejects immediately."""
+    admission = make_admission(max_waiting={"system": 1, "write": 1, "read": 0})
+    await admission.acquire("write")
+
+    with pytest.raises(OverloadedError) as exc_info:
+        await admission.acquire("read")
+
+    assert exc_info.value.retry_after == 3
+    assert admission.stats()["rejected"]["read"] == 1
+
+
+@pytest.mark.asyncio
+async def test_wait_timeout_rejects_and_frees_queue_position():
+    """Test that a timed-out waiter leaves nothing behind."""
+    admission = make_admission(timeout=0.01)
+    await admission.acquire("write")
+
+    with pytest.raises(OverloadedError):
+        await admission.acquire("read")
+    assert admission.stats()["waiting"]["read"] == 0
+
+    admission.release()
+    assert admission.in_use == 0
+    await admission.acquire("read")
+    assert admission.in_use == 1
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_does_not_leak_slot():
+    """Test that cancelling a waiter keeps the slot count correct."""
+    admission = make_admission()
+    await admission.acquire("write")
+
+    waiter = asyncio.create_task(admission.acquire("read"))
+    await asyncio.sleep(0)
+    waiter.cancel()
+    await asyncio.gather(waiter, return_exceptions=True)
+
+    admission.release()
+    assert admission.in_use == 0
+
+
+@pytest.mark.asyncio
+async def test_overloaded_api_returns_503_with_retry_after(monkeypatch):
+    """Test that a refused read is answered with 503 and Retry-After."""
+    admission = make_admission(max_waiting={"system": 1, "write": 1, "read": 0})
+    await admission.acquire("write")
+    monkeypatch.setattr(db, "admission", admission)
+
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        response = await client.get("/api/items/1")
+        health = await client.get("/health")
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "3"
+    assert health.status_code == 200
+    assert health.json()["admission"]["rejected"]["read"] == 1
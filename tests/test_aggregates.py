@@ -0,0 +1,169 @@
+"""Tests for incrementally maintained aggregates."""
+
+import asyncio
+
+import pytest
+
+from plank.db.aggregates import ItemAggregates, xid_visible
+
+
+class FakeDatabase:
+    """Returns canned rows for the aggregate load query."""
+
+    def __init__(self, rows, snapshot="100:100:"):
+        self.rows = rows
+        self.snapshot = snapshot
+        # Set to make the query wait until the test releases it
+        self.release: asyncio.Event | None = None
+
+    async def fetch(self, query):
+        if self.release is not None:
+            await self.release.wait()
+        rows = self.rows or [{"grp": None, "value": None, "n": None}]
+        return [{"snapshot": self.snapshot, **row} for row in rows]
+
+
+def change(action, data, old=None):
+    event = {"table": "items", "action": action, "id": data["id"], "data": data}
+    if old is not None:
+        event["old"] = old
+    return event
+
+
+@pytest.mark.asyncio
+async def test_load_then_apply_deltas():
+    """Test that INSERT/UPDATE/DELETE events keep global aggregates exact."""
+    aggregates = ItemAggregates(database=FakeDatabase([
+        {"grp": None, "value": 10, "n": 2},
+        {"grp": None, "value": 30, "n": 1},
+    ]))
+    await aggregates.load()
+    assert aggregates.snapshot()["global"] == {"count": 3, "sum": 50, "min": 10, "max": 30}
+
+    aggregates.apply(change("INSERT", {"id": 4, "value": 5}))
+    assert aggregates.snapshot()["global"] == {"count": 4, "sum": 55, "min": 5, "max": 30}
+
+    # Moving the only maximum down must rescan for the new maximum
+    aggregates.apply(change("UPDATE", {"id": 3, "value": 20}, old={"id": 3, "value": 30}))
+    assert aggregates.snapshot()["global"] == {"count": 4, "sum": 45, "min": 5, "max": 20}
+
+    aggregates.apply(change("DELETE", {"id": 4, "value": 5}))
+    assert aggregates.snapshot()["global"] == {"count": 3, "sum": 40, "min": 10, "max": 20}
+
+
+@pytest.mark.asyncio
+async def test_grouped_aggregates_move_rows_between_groups():
+    """Test that an UPDATE changing the group column moves the row."""
+    aggregates = ItemAggregates(group_by="name", database=FakeDatabase([
+        {"grp": "a", "value": 1, "n": 1},
+        {"grp": "b", "value": 2, "n": 1},
+    ]))
+    await aggregates.load()
+
+    aggregates.apply(change(
+        "UPDATE",
+        {"id": 1, "name": "b", "value": 7},
+        old={"id": 1, "name": "a", "value": 1},
+    ))
+
+    snapshot = aggregates.snapshot()
+    assert snapshot["groups"] == {"b": {"count": 2, "sum": 9, "min": 2, "max": 7}}
+    assert snapshot["global"] == {"count": 2, "sum": 9, "min": 2, "max": 7}
+
+
+def test_update_without_old_image_is_not_applied():
+    """Test that an UPDATE lacking OLD data is reported as not applicable."""
+    aggregates = ItemAggregates(database=FakeDatabase([]))
+
+    assert aggregates.apply(change("UPDATE", {"id": 1, "value": 3})) is False
+
+
+def test_rejects_invalid_column_names():
+    """Test that column names are validated before being used in SQL."""
+    with pytest.raises(ValueError):
+        ItemAggregates(group_by="name; DROP TABLE items")
+
+
+def test_diff_update_events():
+    """Test that changed-columns-only UPDATEs are applied when they carry enough data."""
+    aggregates = ItemAggregates(database=FakeDatabase([]))
+    aggregates.apply(change("INSERT", {"id": 1, "name": "a", "value": 4}))
+
+    renamed = {"action": "UPDATE", "id": 1, "version": 2, "patch": {"name": "b"}, "old": {"name": "a"}}
+    bumped = {"action": "UPDATE", "id": 1, "version": 3, "patch": {"value": 6}, "old": {"value": 4}}
+
+    assert aggregates.apply(renamed) is True
+    assert aggregates.apply(bumped) is True
+    assert aggregates.snapshot()["global"] == {"count": 1, "sum": 6, "min": 6, "max": 6}
+
+
+def test_diff_update_without_group_key_needs_refresh():
+    """Test that grouped aggregates can't apply a value patch that lacks the group key."""
+    aggregates = ItemAggregates(group_by="name", database=FakeDatabase([]))
+
+    event = {"action": "UPDATE", "id": 1, "version": 2, "patch": {"value": 6}, "old": {"value": 4}}
+
+    assert aggregates.apply(event) is False
+
+
+def test_min_and_max_follow_removals_of_unique_values():
+    """Test that removing extremes one by one keeps min and max exact."""
+    aggregates = ItemAggregates(database=FakeDatabase([]))
+    for i, value in enumerate([5, 1, 9, 3, 7]):
+        aggregates.apply(change("INSERT", {"id": i, "value": value}))
+
+    expected = [(3, 9), (3, 7), (5, 7), (7, 7), (None, None)]
+    for value, (low, high) in zip([1, 9, 3, 5, 7], expected, strict=True):
+        aggregates.apply(change("DELETE", {"id": 0, "value": value}))
+        stats = aggregates.snapshot()["global"]
+        assert (stats["min"], stats["max"]) == (low, high)
+
+    # Values that come back after being removed are found again
+    aggregates.apply(change("INSERT", {"id": 1, "value": 4}))
+    aggregates.apply(change("INSERT", {"id": 2, "value": 2}))
+    aggregates.apply(change("DELETE", {"id": 2, "value": 2}))
+    assert aggregates.snapshot()["global"] == {"count": 1, "sum": 4, "min": 4, "max": 4}
+
+
+def test_xid_visibility():
+    """Test snapshot visibility: finished before xmin, not running, not started."""
+    assert xid_visible("100:105:101,103", 99)
+    assert xid_visible("100:105:101,103", 102)
+    assert not xid_visible("100:105:101,103", 103)
+    assert not xid_visible("100:105:101,103", 105)
+
+
+@pytest.mark.asyncio
+async def test_events_during_reload_are_replayed_unless_in_snapshot():
+    """Test that a reload neither loses nor double-counts concurrent changes."""
+    database = FakeDatabase([{"grp": None, "value": 1, "n": 1}], snapshot="100:102:101")
+    aggregates = ItemAggregates(database=database)
+    await aggregates.load()
+
+    database.release = asyncio.Event()
+    # The table now holds the rows of committed xid 99 and 100 (value 1 and 2)
+    database.rows = [{"grp": None, "value": 1, "n": 1}, {"grp": None, "value": 2, "n": 1}]
+    reload = asyncio.create_task(aggregates.refresh())
+    await asyncio.sleep(0)
+
+    # Arrives while the query runs: xid 100 is in the snapshot, 101 was still running
+    assert aggregates.apply({**change("INSERT", {"id": 2, "value": 2}), "xid": 100})
+    assert aggregates.apply({**change("INSERT", {"id": 3, "value": 3}), "xid": 101})
+    database.release.set()
+    await reload
+
+    assert aggregates.snapshot()["global"] == {"count": 3, "sum": 6, "min": 1, "max": 3}
+
+
+@pytest.mark.asyncio
+async def test_events_after_reload_are_skipped_if_in_snapshot():
+    """Test that late or re-delivered changes already in the load are not counted twice."""
+    database = FakeDatabase([{"grp": None, "value": 7, "n": 1}], snapshot="101:101:")
+    aggregates = ItemAggregates(database=database)
+    await aggregates.refresh()
+
+    # xid 100 committed before the load; 101 started after it
+    assert aggregates.apply({**change("INSERT", {"id": 1, "value": 7}), "xid": 100})
+    assert aggregates.snapshot()["global"] == {"count": 1, "sum": 7, "min": 7, "max": 7}
+    assert aggregates.apply({**change("INSERT", {"id": 2, "value": 5}), "xid": 101})
+    assert aggregates.snapshot()["global"] == {"count": 2, "sum": 12, "min": 5, "max": 7}
@@ -1,9 +1,17 @@
 """Tests for API endpoints."""
 
+import asyncio
+import warnings
+from datetime import datetime
+
 import pytest
 from httpx import ASGITransport, AsyncClient
 
+from plank import main
+from plank.api import routes
+from plank.config import settings
 from plank.main import app
+from plank.webhooks import WebhookDispatcher
 
 
 @pytest.mark.asyncio
@@ -16,6 +24,19 @@ async def test_health_endpoint():
         assert response.status_code == 200
         data = response.json()
         assert "status" in data
+        assert "webhooks" not in data
+
+
+@pytest.mark.asyncio
+async def test_health_reports_webhook_delivery(monkeypatch):
+    """Test that per-endpoint webhook counters show up in the health check."""
+    monkeypatch.setattr(main, "webhooks", WebhookDispatcher(urls=["http://hooks.test/items"]))
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        response = await client.get("/health")
+
+    assert response.json()["webhooks"] == {
+        "http://hooks.test/items": {"queued": 0, "delivered": 0, "failed": 0},
+    }
 
 
 @pytest.mark.asyncio
@@ -29,3 +50,76 @@ async def test_root_endpoint():
         # Should return HTML if frontend is built, or JSON fallback if not
         content_type = response.headers["content-type"]
         assert "html" in content_type or "json" in content_type
+
+
+@pytest.mark.asyncio
+async def test_aggregates_endpoint(monkeypatch):
+    """Test aggregates endpoint returns global count/sum/min/max."""
+    monkeypatch.setattr(settings, "aggregates", True)
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url="http://test"
+    ) as client:
+        response = await client.get("/api/aggregates")
+        assert response.status_code == 200
+        assert set(response.json()["global"]) == {"count", "sum", "min", "max"}
+
+        monkeypatch.setattr(settings, "aggregates", False)
+        response = await client.get("/api/aggregates")
+        assert response.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_shared_read_serializes_rows_as_items(monkeypatch):
+    """Test that database rows are validated into Items before being dumped."""
+    row = {"id": 1, "name": "a", "value": 2, "created_at": datetime(2024, 1, 1), "updated_at": datetime(2024, 1, 1), "version": 1}
+
+    async def fetch(query, *args):
+        return [row]
+
+    async def fetchrow(query, *args):
+        return row
+
+    monkeypatch.setattr(routes.db, "fetch", fetch)
+    monkeypatch.setattr(routes.db, "fetchrow", fetchrow)
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        many = await routes.shared_read("SELECT * FROM items")
+        one = await routes.shared_read("SELECT * FROM items WHERE id = $1", 1, many=False)
+
+    assert many == b"[" + one + b"]"
+    assert one.startswith(b'{"id":1,"name":"a","value":2,"created_at":"2024-01-01T00:00:00"')
+
+
+@pytest.mark.asyncio
+async def test_reads_after_a_write_do_not_join_older_flights(monkeypatch):
+    """Test read-your-writes: a GET after a PUT never shares a query started before it."""
+    value = 1
+    release = asyncio.Event()
+
+    def item(v):
+        return {"id": 1, "name": "a", "value": v, "created_at": datetime(2024, 1, 1), "updated_at": datetime(2024, 1, 1), "version": v}
+
+    async def fetchrow(query, *args):
+        nonlocal value
+        if query.lstrip().startswith("UPDATE"):
+            value = args[1]
+            return item(value)
+        seen = item(value)
+        await release.wait()
+        return seen
+
+    monkeypatch.setattr(routes.db, "fetchrow", fetchrow)
+    monkeypatch.setattr(settings, "coalesce_reads", True)
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        before = asyncio.create_task(client.get("/api/items/1"))
+        while not len(routes.reads):
+            await asyncio.sleep(0)
+
+        response = await client.put("/api/items/1", json={"name": "a", "value": 2})
+        assert response.status_code == 200
+        after = asyncio.create_task(client.get("/api/items/1"))
+        await asyncio.sleep(0.01)
+        release.set()
+
+        assert (await before).json()["value"] == 1
+        assert (await after).json()["value"] == 2
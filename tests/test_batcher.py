@@ -0,0 +1,102 @@
+"""Tests for insert write coalescing."""
+
+import asyncio
+
+import asyncpg
+import pytest
+
+from plank.db.admission import OverloadedError
+from plank.db.batcher import InsertBatcher
+
+
+class FakeDatabase:
+    """Records queries and fabricates RETURNING rows."""
+
+    def __init__(self, fail_batch: Exception | None = None, bad_names: tuple = ()):
+        self.fail_batch = fail_batch
+        self.bad_names = bad_names
+        self.batches: list[list] = []
+        self.singles: list[tuple] = []
+        self.next_id = 1
+
+    def _row(self, name, value):
+        row = {"id": self.next_id, "name": name, "value": value}
+        self.next_id += 1
+        return row
+
+    async def fetch(self, query, names, values):
+        self.batches.append(names)
+        if self.fail_batch:
+            raise self.fail_batch
+        rows = [self._row(n, v) for n, v in zip(names, values, strict=True)]
+        # RETURNING order is not guaranteed; the batcher must not depend on it
+        return list(reversed(rows))
+
+    async def fetchrow(self, query, name, value):
+        self.singles.append((name, value))
+        if name in self.bad_names:
+            raise ValueError(f"bad row: {name}")
+        return self._row(name, value)
+
+
+@pytest.mark.asyncio
+async def test_concurrent_inserts_share_one_statement():
+    """Test that concurrent inserts are written as one batch and each caller gets its row."""
+    database = FakeDatabase()
+    batcher = InsertBatcher("items", {"name": "varchar", "value": "integer"}, database, window=0.01)
+
+    rows = await asyncio.gather(*(batcher.insert(f"item {i}", i) for i in range(5)))
+
+    assert database.batches == [[f"item {i}" for i in range(5)]]
+    assert [row["name"] for row in rows] == [f"item {i}" for i in range(5)]
+    assert [row["value"] for row in rows] == list(range(5))
+
+
+@pytest.mark.asyncio
+async def test_max_size_flushes_without_waiting_for_window():
+    """Test that a full batch is written immediately."""
+    database = FakeDatabase()
+    batcher = InsertBatcher(
+        "items", {"name": "varchar", "value": "integer"}, database, window=60, max_size=3
+    )
+
+    rows = await asyncio.wait_for(
+        asyncio.gather(*(batcher.insert(f"item {i}", i) for i in range(3))), timeout=1
+    )
+
+    assert len(rows) == 3
+    assert len(database.batches) == 1
+
+
+@pytest.mark.asyncio
+async def test_failed_batch_isolates_errors_per_caller():
+    """Test that a failing row only fails its own caller."""
+    database = FakeDatabase(fail_batch=asyncpg.DataError("batch failed"), bad_names=("bad",))
+    batcher = InsertBatcher("items", {"name": "varchar", "value": "integer"}, database, window=0.01)
+
+    results = await asyncio.gather(
+        batcher.insert("good", 1),
+        batcher.insert("bad", 2),
+        batcher.insert("also good", 3),
+        return_exceptions=True,
+    )
+
+    assert results[0]["name"] == "good"
+    assert isinstance(results[1], ValueError)
+    assert results[2]["name"] == "also good"
+    assert database.singles == [("good", 1), ("bad", 2), ("also good", 3)]
+
+
+@pytest.mark.asyncio
+async def test_non_data_errors_fail_the_whole_batch_without_retries():
+    """Test that overload or connection errors reach every caller instead of row retries."""
+    error = OverloadedError("write", "queue full", 1)
+    database = FakeDatabase(fail_batch=error)
+    batcher = InsertBatcher("items", {"name": "varchar", "value": "integer"}, database, window=0.01)
+
+    results = await asyncio.gather(
+        *(batcher.insert(f"item {i}", i) for i in range(3)), return_exceptions=True
+    )
+
+    assert results == [error] * 3
+    assert database.singles == []
@@ -0,0 +1,46 @@
+"""Tests for the ``plank serve`` entry point."""
+
+import pytest
+
+from plank import cli
+from plank.config import settings
+
+
+def test_server_options_come_from_settings(monkeypatch):
+    """Test that tuning settings reach uvicorn and flags override them."""
+    monkeypatch.setattr(settings, "workers", 4)
+    monkeypatch.setattr(settings, "backlog", 4096)
+    monkeypatch.setattr(settings, "ws_max_size", 65536)
+
+    options = cli.server_options(port=9000)
+
+    assert options["port"] == 9000
+    assert options["host"] == settings.host
+    assert options["workers"] == 4
+    assert options["backlog"] == 4096
+    assert options["ws_max_size"] == 65536
+    assert options["ws_per_message_deflate"] is False
+    assert cli.server_options(workers=2)["workers"] == 2
+    assert cli.server_options(reload=True)["workers"] == 1
+
+
+def test_falls_back_without_uvloop_and_httptools(monkeypatch):
+    """Test that the pure-Python loop and parser are used when extras are missing."""
+    monkeypatch.setattr(cli, "has_module", lambda name: False)
+
+    options = cli.server_options()
+
+    assert options["loop"] == "asyncio"
+    assert options["http"] == "h11"
+
+
+@pytest.mark.parametrize(
+    "setting, value",
+    [("role", "relay"), ("webhook_urls", ["http://hook"]), ("change_capture", "logical")],
+)
+def test_single_process_features_refuse_multiple_workers(monkeypatch, setting, value):
+    """Test that features which must run once per deployment refuse extra workers."""
+    monkeypatch.setattr(settings, setting, value)
+
+    with pytest.raises(SystemExit):
+        cli.server_options(workers=2)
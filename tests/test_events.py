@@ -0,0 +1,146 @@
+"""Tests for undecoded pass-through of NOTIFY payloads."""
+
+import asyncio
+import json
+
+import pytest
+
+from plank import main
+from plank.db.listener import PostgresListener
+from plank.events import RawEvent, to_json
+from plank.relay import decode_batch, encode_batch
+from plank.websocket.manager import ConnectionManager
+
+# Spacing as produced by json_build_object()
+PAYLOAD = '{"table" : "items", "action" : "INSERT", "ts" : 1.5, "id" : 7, "data" : {"id" : 7}}'
+
+
+class FakeWebSocket:
+    """Collects sent text frames."""
+
+    def __init__(self):
+        self.sent: list[str] = []
+
+    async def send_text(self, text: str):
+        self.sent.append(text)
+
+
+def test_raw_event_decodes_lazily_once():
+    """Test that fields are parsed on first access and to_json reuses the raw text."""
+    event = RawEvent(PAYLOAD)
+
+    assert to_json(event) is PAYLOAD
+    assert not event.decoded
+
+    assert event["id"] == 7
+    assert event.get("missing") is None
+    assert "data" in event
+    assert event == json.loads(PAYLOAD)
+    assert event.decoded
+    assert to_json({"id": 1}) == '{"id": 1}'
+
+
+@pytest.mark.asyncio
+async def test_broadcast_forwards_payload_without_decoding():
+    """Test that a notification reaches every socket as the exact payload text."""
+    listener = PostgresListener()
+    manager = ConnectionManager()
+    manager.active_connections = [FakeWebSocket(), FakeWebSocket()]
+    events = []
+
+    async def broadcast(channel, data):
+        events.append(data)
+        await manager.broadcast(data)
+
+    listener.subscribe("item_changes", broadcast)
+    await listener._notification_handler(None, 1, "item_changes", PAYLOAD)
+
+    [event] = events
+    assert isinstance(event, RawEvent)
+    assert [ws.sent for ws in manager.active_connections] == [[PAYLOAD], [PAYLOAD]]
+    assert not event.decoded
+
+    # The resume point is only read when draining
+    assert manager.last_event_ts == 1.5
+
+
+@pytest.mark.asyncio
+async def test_default_consumers_do_not_decode_events(monkeypatch):
+    """Test that with the default settings no item_changes consumer parses the payload."""
+    listener = PostgresListener()
+    monkeypatch.setattr(main, "listener", listener)
+    monkeypatch.setattr(main.manager, "active_connections", [FakeWebSocket()])
+    events = []
+    listener.subscribe("item_changes", lambda channel, data: events.append(data))
+
+    main.subscribe_item_changes()
+    await listener._notification_handler(None, 1, "item_changes", PAYLOAD)
+    await asyncio.sleep(0)
+
+    [event] = events
+    assert main.manager.active_connections[0].sent == [PAYLOAD]
+    assert not event.decoded
+
+
+@pytest.mark.asyncio
+async def test_non_json_payload_falls_back_to_raw_field():
+    """Test that plain-text NOTIFYs are still wrapped as before."""
+    listener = PostgresListener()
+    events = []
+    listener.subscribe("item_changes", lambda channel, data: events.append(data))
+
+    await listener._notification_handler(None, 1, "item_changes", "hello")
+
+    assert events == [{"raw": "hello"}]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("payload", ["{not json}", '{"table": "items", "id": 1}'])
+async def test_only_trigger_payloads_pass_through(payload):
+    """Test that other brace-wrapped NOTIFYs are decoded, and invalid ones never reach clients."""
+    listener = PostgresListener()
+    manager = ConnectionManager()
+    manager.active_connections = [FakeWebSocket()]
+    events = []
+
+    async def broadcast(channel, data):
+        events.append(data)
+        await manager.broadcast(data)
+
+    listener.subscribe("item_changes", broadcast)
+    await listener._notification_handler(None, 1, "item_changes", payload)
+
+    [event] = events
+    assert not isinstance(event, RawEvent)
+    [sent] = manager.active_connections[0].sent
+    expected = {"raw": payload} if payload == "{not json}" else json.loads(payload)
+    assert json.loads(sent) == expected
+
+
+def test_invalid_json_in_braces_falls_back_to_raw_field():
+    """Test that brace-wrapped text that isn't JSON is wrapped once it is read."""
+    event = RawEvent("{not json}")
+
+    assert event.get("action") is None
+    assert event == {"raw": "{not json}"}
+    assert json.loads(to_json(event)) == {"raw": "{not json}"}
+
+
+def test_relay_batch_carries_raw_payloads():
+    """Test that relay frames carry raw payloads that gateways receive undecoded."""
+    frame = encode_batch(3, [("item_changes", RawEvent(PAYLOAD)), ("item_changes", {"id": 8})])
+
+    assert PAYLOAD.encode() in frame
+    seq, events = decode_batch(frame[4:])
+    assert seq == 3
+    assert [channel for channel, _ in events] == ["item_changes", "item_changes"]
+    assert [event.raw for _, event in events] == [PAYLOAD, '{"id": 8}']
+    assert not any(event.decoded for _, event in events)
+    assert decode_batch(encode_batch(4, [])[4:]) == (4, [])
+
+
+@pytest.mark.parametrize("body", [b"", encode_batch(1, [("c", {"id": 1})])[4:-1], encode_batch(1, [])[4:] + b"x"])
+def test_malformed_relay_batches_are_rejected(body):
+    """Test that truncated or padded batches raise ValueError."""
+    with pytest.raises(ValueError):
+        decode_batch(body)
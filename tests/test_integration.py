@@ -6,6 +6,9 @@ import json
 import asyncpg
 import pytest
 
+from plank.config import settings
+from plank.db.init import create_schema
+
 
 @pytest.mark.asyncio
 async def test_item_insertion_triggers_notification(db_connection, test_db_url):
@@ -56,6 +59,8 @@ async def test_item_insertion_triggers_notification(db_connection, test_db_url):
         assert payload["id"] == row["id"]
         assert payload["data"]["name"] == "Test Item"
         assert payload["data"]["value"] == 42
+        assert isinstance(payload["ts"], float)
+        assert isinstance(payload["xid"], int)
 
         print(f"✓ Notification received: {payload}")
 
@@ -126,6 +131,8 @@ async def test_item_update_triggers_notification(db_connection, test_db_url):
         assert payload["id"] == item_id
         assert payload["data"]["name"] == "Updated Item"
         assert payload["data"]["value"] == 99
+        assert payload["old"]["name"] == "Original Item"
+        assert payload["old"]["value"] == 10
 
         print(f"✓ Update notification received: {payload}")
 
@@ -293,3 +300,114 @@ async def test_updated_at_timestamp_changes_on_update(db_connection):
     assert updated_row["updated_at"] > original_updated_at
 
     print("✓ Timestamp triggers working correctly")
+
+
+@pytest.mark.asyncio
+async def test_diff_mode_update_sends_changed_columns_only(db_connection, test_db_url):
+    """Test that diff mode UPDATE events carry only changed columns and the row version."""
+    listener_conn = await asyncpg.connect(test_db_url)
+    notifications = []
+
+    def notification_handler(connection, pid, channel, payload):
+        """Handle incoming notifications."""
+        notifications.append(json.loads(payload))
+
+    settings.update_events = "diff"
+    try:
+        await create_schema(db_connection)
+        await listener_conn.add_listener("item_changes", notification_handler)
+
+        row = await db_connection.fetchrow(
+            "INSERT INTO items (name, value) VALUES ($1, $2) RETURNING id, version",
+            "Counter",
+            1,
+        )
+        assert row["version"] == 1
+
+        await db_connection.execute("UPDATE items SET value = value + 1 WHERE id = $1", row["id"])
+        await asyncio.sleep(0.5)
+
+        payload = notifications[-1]
+        assert payload["action"] == "UPDATE"
+        assert payload["id"] == row["id"]
+        assert payload["version"] == 2
+        assert "data" not in payload
+        assert payload["patch"]["value"] == 2
+        assert "name" not in payload["patch"]
+        assert "created_at" not in payload["patch"]
+        assert payload["old"]["value"] == 1
+
+        print(f"✓ Diff notification received: {payload}")
+
+    finally:
+        settings.update_events = "full"
+        await create_schema(db_connection)
+        await listener_conn.close()
+
+
+@pytest.mark.asyncio
+async def test_noop_update_does_not_notify(db_connection, test_db_url):
+    """Test that an UPDATE that changes nothing sends no notification and keeps the version."""
+    listener_conn = await asyncpg.connect(test_db_url)
+    notifications = []
+
+    def notification_handler(connection, pid, channel, payload):
+        """Handle incoming notifications."""
+        notifications.append(json.loads(payload))
+
+    try:
+        row = await db_connection.fetchrow(
+            "INSERT INTO items (name, value) VALUES ($1, $2) RETURNING id", "Same", 5
+        )
+        await listener_conn.add_listener("item_changes", notification_handler)
+
+        updated = await db_connection.fetchrow(
+            "UPDATE items SET name = $1, value = $2 WHERE id = $3 RETURNING version",
+            "Same",
+            5,
+            row["id"],
+        )
+        await asyncio.sleep(0.5)
+
+        assert updated["version"] == 1
+        assert notifications == []
+
+    finally:
+        await listener_conn.close()
+
+
+@pytest.mark.asyncio
+async def test_session_can_mute_or_defer_notifications(db_connection, test_db_url):
+    """Test that plank.notify = 'off' mutes and 'defer' collapses a batch into one RESYNC."""
+    listener_conn = await asyncpg.connect(test_db_url)
+    notifications = []
+
+    def notification_handler(connection, pid, channel, payload):
+        """Handle incoming notifications."""
+        notifications.append(json.loads(payload))
+
+    try:
+        await listener_conn.add_listener("item_changes", notification_handler)
+
+        async with db_connection.transaction():
+            await db_connection.execute("SET LOCAL plank.notify = 'off'")
+            await db_connection.execute(
+                "INSERT INTO items (name, value) SELECT 'muted', g FROM generate_series(1, 10) g"
+            )
+        await asyncio.sleep(0.5)
+        assert notifications == []
+
+        async with db_connection.transaction():
+            await db_connection.execute("SET LOCAL plank.notify = 'defer'")
+            await db_connection.execute("UPDATE items SET value = value + 1")
+            await db_connection.execute("DELETE FROM items WHERE value > 5")
+        await asyncio.sleep(0.5)
+        assert notifications == [{"table": "items", "action": "RESYNC"}]
+
+        # The setting was transaction-local, so per-row events are back
+        await db_connection.execute("INSERT INTO items (name, value) VALUES ('loud', 1)")
+        await asyncio.sleep(0.5)
+        assert notifications[-1]["action"] == "INSERT"
+
+    finally:
+        await listener_conn.close()
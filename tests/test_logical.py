@@ -0,0 +1,163 @@
+"""Tests for logical decoding change capture."""
+
+import json
+
+import asyncpg
+import pytest
+
+from plank.config import settings
+from plank.db.logical import LogicalListener, full_xid, parse_test_decoding, parse_wal2json
+
+
+class Crash(BaseException):
+    """Stands in for the process dying in the middle of a batch."""
+
+
+def test_test_decoding_insert():
+    """Test that an INSERT line yields the same shape as the NOTIFY trigger."""
+    event = parse_test_decoding(
+        "table public.items: INSERT: id[integer]:1 name[character varying]:'It''s here' "
+        "value[integer]:42 created_at[timestamp without time zone]:'2024-01-02 03:04:05.123' "
+        "updated_at[timestamp without time zone]:null"
+    )
+
+    assert event == {
+        "table": "items",
+        "action": "INSERT",
+        "id": 1,
+        "data": {
+            "id": 1,
+            "name": "It's here",
+            "value": 42,
+            "created_at": "2024-01-02T03:04:05.123",
+            "updated_at": None,
+        },
+    }
+
+
+def test_test_decoding_update_with_full_identity():
+    """Test that UPDATE uses the new tuple and fills unchanged TOAST values from the old one."""
+    event = parse_test_decoding(
+        "table public.items: UPDATE: old-key: id[integer]:7 name[text]:'big' value[integer]:1 "
+        "new-tuple: id[integer]:7 name[text]:unchanged-toast-datum value[integer]:2"
+    )
+
+    assert event["action"] == "UPDATE"
+    assert event["id"] == 7
+    assert event["data"] == {"id": 7, "name": "big", "value": 2}
+    assert event["old"] == {"id": 7, "name": "big", "value": 1}
+
+
+def test_test_decoding_delete():
+    """Test that DELETE carries the old row."""
+    event = parse_test_decoding(
+        "table public.items: DELETE: id[integer]:3 name[character varying]:'gone' value[integer]:9"
+    )
+
+    assert event["action"] == "DELETE"
+    assert event["data"] == {"id": 3, "name": "gone", "value": 9}
+
+
+def test_test_decoding_ignores_transaction_markers():
+    """Test that BEGIN/COMMIT and TRUNCATE lines are not events."""
+    assert parse_test_decoding("BEGIN") is None
+    assert parse_test_decoding("COMMIT") is None
+    assert parse_test_decoding("table public.items: TRUNCATE: (no-flags)") is None
+
+
+def test_wal2json_update():
+    """Test that wal2json format-version 2 changes are normalized."""
+    line = json.dumps({
+        "action": "U",
+        "schema": "public",
+        "table": "items",
+        "columns": [
+            {"name": "id", "type": "integer", "value": 5},
+            {"name": "value", "type": "integer", "value": 11},
+            {"name": "updated_at", "type": "timestamp without time zone", "value": "2024-01-01 00:00:00"},
+        ],
+        "identity": [{"name": "id", "type": "integer", "value": 5}],
+    })
+
+    event = parse_wal2json(line)
+
+    assert event == {
+        "table": "items",
+        "action": "UPDATE",
+        "id": 5,
+        "data": {"id": 5, "value": 11, "updated_at": "2024-01-01T00:00:00"},
+        "old": {"id": 5},
+    }
+    assert parse_wal2json('{"action":"B"}') is None
+
+
+def test_full_xid_picks_the_epoch_of_the_transaction():
+    """Test that 32-bit slot xids are widened to match trigger and snapshot xids."""
+    assert full_xid(1500, 1607) == 1500
+    assert full_xid(10, (3 << 32) + 20) == (3 << 32) + 10
+    # Started just before the xid counter wrapped into the current epoch
+    assert full_xid(2**32 - 5, (3 << 32) + 20) == (2 << 32) + 2**32 - 5
+
+
+@pytest.mark.asyncio
+async def test_poll_confirms_only_dispatched_transactions(db_connection, test_db_url, monkeypatch):
+    """Test that changes are re-delivered after a crash and not after the slot advanced."""
+    monkeypatch.setattr(settings, "database_url", test_db_url)
+    monkeypatch.setattr(settings, "logical_slot_name", "plank_test_slot")
+    monkeypatch.setattr(settings, "logical_plugin", "test_decoding")
+
+    async def start(callback) -> LogicalListener:
+        listener = LogicalListener()
+        listener.subscribe("item_changes", callback)
+        await listener.listen("item_changes")
+        return listener
+
+    listeners = []
+    try:
+        try:
+            listeners.append(await start(lambda channel, data: None))
+        except (asyncpg.UndefinedFileError, asyncpg.ObjectNotInPrerequisiteStateError) as e:
+            pytest.skip(f"Logical decoding unavailable: {e}")
+        await db_connection.execute("ALTER TABLE items REPLICA IDENTITY FULL")
+
+        async with db_connection.transaction():
+            xid = await db_connection.fetchval("SELECT pg_current_xact_id()::text::bigint")
+            await db_connection.execute("INSERT INTO items (name, value) VALUES ('a', 1), ('b', 2)")
+        await db_connection.execute("UPDATE items SET value = 3 WHERE name = 'a'")
+
+        # Crash after dispatching everything but before confirming
+        delivered = []
+
+        def crash_after_last(channel, data):
+            delivered.append(data)
+            if len(delivered) == 3:
+                raise Crash
+
+        listeners.append(await start(crash_after_last))
+        with pytest.raises(Crash):
+            await listeners[-1].poll()
+
+        # A restarted listener gets the same changes again, then confirms them
+        redelivered = []
+        listeners.append(await start(lambda channel, data: redelivered.append(data)))
+        assert await listeners[-1].poll() > 0
+        assert [event["action"] for event in redelivered] == ["INSERT", "INSERT", "UPDATE"]
+        assert redelivered[:2] == delivered[:2]
+        assert [event["xid"] for event in redelivered[:2]] == [xid, xid]
+        assert redelivered[2]["xid"] > xid
+        assert redelivered[2]["old"]["value"] == 1
+        assert redelivered[2]["data"]["value"] == 3
+
+        # Once confirmed, neither this listener nor a restarted one sees them again
+        assert await listeners[-1].poll() == 0
+        listeners.append(await start(lambda channel, data: redelivered.append(data)))
+        assert await listeners[-1].poll() == 0
+        assert len(redelivered) == 3
+    finally:
+        for listener in listeners:
+            await listener.disconnect()
+        await db_connection.execute("ALTER TABLE items REPLICA IDENTITY DEFAULT")
+        await db_connection.execute(
+            "SELECT pg_drop_replication_slot(slot_name) FROM pg_replication_slots WHERE slot_name = $1",
+            "plank_test_slot",
+        )
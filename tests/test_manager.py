@@ -0,0 +1,55 @@
+"""Tests for WebSocket connection management."""
+
+import json
+
+import pytest
+from starlette.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
+
+from plank.main import app, manager
+from plank.websocket.manager import ConnectionManager
+
+
+class FakeWebSocket:
+    """Records sent frames and the close code."""
+
+    def __init__(self):
+        self.sent: list[dict] = []
+        self.close_code: int | None = None
+
+    async def send_text(self, text: str):
+        self.sent.append(json.loads(text))
+
+    async def close(self, code: int = 1000):
+        self.close_code = code
+
+
+@pytest.mark.asyncio
+async def test_drain_closes_clients_in_waves_with_reconnect_hint():
+    """Test that every client is told when to reconnect and from where, then closed."""
+    manager = ConnectionManager()
+    clients = [FakeWebSocket() for _ in range(5)]
+    manager.active_connections = list(clients)
+    await manager.broadcast({"action": "INSERT", "id": 1, "ts": 123.5})
+
+    await manager.drain(waves=2, interval=0.001, max_delay=2.0)
+
+    assert manager.draining
+    assert manager.active_connections == []
+    for client in clients:
+        reconnect = client.sent[-1]
+        assert reconnect["type"] == "reconnect"
+        assert 0 <= reconnect["delay_ms"] <= 2000
+        assert reconnect["resume"] == {"ts": 123.5}
+        assert client.close_code == 1012
+
+
+def test_draining_instance_refuses_new_websockets():
+    """Test that /ws turns clients away once draining has started."""
+    manager.draining = True
+    try:
+        with pytest.raises(WebSocketDisconnect) as exc_info, TestClient(app).websocket_connect("/ws"):
+            pass
+        assert exc_info.value.code == 1013
+    finally:
+        manager.draining = False
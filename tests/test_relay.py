@@ -0,0 +1,179 @@
+"""Tests for the relay between listener nodes and gateways."""
+
+import asyncio
+
+import pytest
+
+from plank.relay import RelayClient, RelayServer, encode_frame
+
+TOKEN = "s3cret"
+
+
+async def wait_for(condition, timeout=2.0):
+    """Poll until ``condition()`` holds."""
+    async with asyncio.timeout(timeout):
+        while not condition():
+            await asyncio.sleep(0.01)
+
+
+async def start_relay(**kwargs) -> RelayServer:
+    relay = RelayServer(batch_window=0.001, heartbeat=0.2, token=TOKEN, **kwargs)
+    await relay.start("127.0.0.1", 0)
+    return relay
+
+
+async def start_gateway(relay: RelayServer, events: list) -> tuple[RelayClient, asyncio.Task]:
+    gateway = RelayClient(relays=[f"127.0.0.1:{relay.port}"], heartbeat=0.2, token=TOKEN)
+    gateway.subscribe("item_changes", lambda channel, data: events.append(data))
+    await gateway.listen("item_changes")
+    connected = len(relay.gateways)
+    task = asyncio.create_task(gateway.start())
+    await wait_for(lambda: len(relay.gateways) > connected)
+    return gateway, task
+
+
+async def stop(gateway: RelayClient, task: asyncio.Task):
+    await gateway.disconnect()
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+
+
+@pytest.mark.asyncio
+async def test_gateways_receive_batched_events_in_order():
+    """Test that every gateway gets each event once, in sequence order."""
+    relay = await start_relay()
+    received = [[], []]
+    gateways = []
+    for events in received:
+        gateways.append(await start_gateway(relay, events))
+
+    for i in range(1, 51):
+        relay.publish("item_changes", {"action": "INSERT", "id": i})
+    relay.publish("other_channel", {"action": "INSERT", "id": 99})
+
+    await wait_for(lambda: all(len(events) == 50 for events in received))
+    for events in received:
+        assert [event["id"] for event in events] == list(range(1, 51))
+    assert gateways[0][0].last_seq == 51
+
+    for gateway, task in gateways:
+        await stop(gateway, task)
+    await relay.stop()
+
+
+@pytest.mark.asyncio
+async def test_reconnecting_gateway_replays_missed_events():
+    """Test that a gateway resumes from the relay's buffer after losing its connection."""
+    relay = await start_relay()
+    events = []
+    gateway, task = await start_gateway(relay, events)
+
+    relay.publish("item_changes", {"action": "INSERT", "id": 1})
+    await wait_for(lambda: len(events) == 1)
+
+    # Cut the connection and publish while the gateway is away
+    for writer in list(relay.gateways):
+        relay._drop(writer)
+    relay.publish("item_changes", {"action": "INSERT", "id": 2})
+    relay.publish("item_changes", {"action": "INSERT", "id": 3})
+
+    await wait_for(lambda: len(events) == 3, timeout=5)
+    assert [event["id"] for event in events] == [1, 2, 3]
+
+    await stop(gateway, task)
+    await relay.stop()
+
+
+@pytest.mark.asyncio
+async def test_lost_events_trigger_resync():
+    """Test that a gateway falling behind the relay's buffer dispatches RESYNC."""
+    relay = await start_relay(buffer_size=2)
+    events = []
+    gateway, task = await start_gateway(relay, events)
+
+    for writer in list(relay.gateways):
+        relay._drop(writer)
+    for i in range(1, 6):
+        relay.publish("item_changes", {"action": "INSERT", "id": i})
+
+    await wait_for(lambda: events, timeout=5)
+    assert events == [{"action": "RESYNC"}]
+    assert gateway.last_seq == 5
+
+    relay.publish("item_changes", {"action": "INSERT", "id": 6})
+    await wait_for(lambda: len(events) == 2)
+    assert events[-1]["id"] == 6
+
+    await stop(gateway, task)
+    await relay.stop()
+
+
+@pytest.mark.asyncio
+async def test_relay_rejects_wrong_token():
+    """Test that gateways must present the shared token."""
+    relay = RelayServer(token="secret")
+    await relay.start("127.0.0.1", 0)
+    gateway = RelayClient(relays=[f"127.0.0.1:{relay.port}"], token="wrong")
+
+    with pytest.raises(ConnectionError):
+        await gateway._open()
+    assert not relay.gateways
+
+    await relay.stop()
+
+
+@pytest.mark.asyncio
+async def test_relay_refuses_to_start_without_token():
+    """Test that a relay never accepts gateways without a shared token."""
+    relay = RelayServer(token="")
+
+    with pytest.raises(RuntimeError, match="RELAY_TOKEN"):
+        await relay.start("127.0.0.1", 0)
+    assert relay.port is None
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("hello", [[], {"epoch": "e"}, {"epoch": "e", "seq": "1", "oldest": 1}])
+async def test_gateway_treats_malformed_frames_as_lost_connection(hello):
+    """Test that a bad hello or batch makes the gateway reconnect instead of crashing."""
+    connections = []
+
+    async def bad_relay(reader, writer):
+        connections.append(writer)
+        if len(connections) == 1:
+            writer.write(encode_frame(hello))
+        else:
+            writer.write(encode_frame({"epoch": "e", "seq": 0, "oldest": 1}))
+            writer.write(b"\x00\x00\x00\x03abc")
+        await writer.drain()
+
+    server = await asyncio.start_server(bad_relay, "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+    gateway = RelayClient(relays=[f"127.0.0.1:{port}"], heartbeat=0.2, token=TOKEN)
+    task = asyncio.create_task(gateway.start())
+
+    await wait_for(lambda: len(connections) >= 3, timeout=10)
+    assert not task.done()
+
+    await stop(gateway, task)
+    server.close()
+
+
+@pytest.mark.asyncio
+async def test_relay_drops_gateway_with_malformed_hello():
+    """Test that a bad hello closes that connection and the relay keeps serving."""
+    relay = await start_relay()
+    reader, writer = await asyncio.open_connection("127.0.0.1", relay.port)
+    writer.write(encode_frame({"token": TOKEN, "epoch": None, "seq": "0"}))
+
+    assert await asyncio.wait_for(reader.read(), timeout=2) == b""
+    assert not relay.gateways
+
+    events = []
+    gateway, task = await start_gateway(relay, events)
+    relay.publish("item_changes", {"action": "INSERT", "id": 1})
+    await wait_for(lambda: events)
+
+    writer.close()
+    await stop(gateway, task)
+    await relay.stop()
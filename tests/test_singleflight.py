@@ -0,0 +1,91 @@
+"""Tests for single-flight read coalescing."""
+
+import asyncio
+
+import pytest
+
+from plank.db.singleflight import SingleFlight
+
+
+@pytest.mark.asyncio
+async def test_concurrent_calls_share_one_execution():
+    """Test that identical concurrent calls run once and all get the result."""
+    flight = SingleFlight()
+    calls = 0
+
+    async def query():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return b"[]"
+
+    results = await asyncio.gather(*(flight.do(("SELECT", ()), query) for _ in range(50)))
+
+    assert calls == 1
+    assert results == [b"[]"] * 50
+    assert len(flight) == 0
+
+
+@pytest.mark.asyncio
+async def test_results_are_not_cached_and_keys_are_independent():
+    """Test that finished flights re-run and different keys don't coalesce."""
+    flight = SingleFlight()
+    calls = []
+
+    async def query(key):
+        calls.append(key)
+        await asyncio.sleep(0)
+        return key
+
+    await flight.do(1, lambda: query(1))
+    await asyncio.gather(flight.do(1, lambda: query(1)), flight.do(2, lambda: query(2)))
+
+    assert calls == [1, 1, 2]
+
+
+@pytest.mark.asyncio
+async def test_errors_reach_every_waiter_and_cancellation_does_not():
+    """Test that a failure is shared but one cancelled caller doesn't abort the flight."""
+    flight = SingleFlight()
+    release = asyncio.Event()
+
+    async def failing():
+        await release.wait()
+        raise RuntimeError("boom")
+
+    first = asyncio.create_task(flight.do("k", failing))
+    second = asyncio.create_task(flight.do("k", failing))
+    await asyncio.sleep(0)
+    first.cancel()
+    release.set()
+
+    with pytest.raises(asyncio.CancelledError):
+        await first
+    with pytest.raises(RuntimeError, match="boom"):
+        await second
+
+
+@pytest.mark.asyncio
+async def test_forget_all_makes_later_callers_start_fresh():
+    """Test that after a change, new callers don't join a flight that predates it."""
+    flight = SingleFlight()
+    release = asyncio.Event()
+    calls = 0
+
+    async def query():
+        nonlocal calls
+        calls += 1
+        await release.wait()
+        return calls
+
+    before = asyncio.create_task(flight.do("k", query))
+    await asyncio.sleep(0)
+    flight.forget_all()
+    after = asyncio.create_task(flight.do("k", query))
+    await asyncio.sleep(0)
+    release.set()
+
+    assert await before == 2
+    assert await after == 2
+    assert calls == 2
+    assert len(flight) == 0
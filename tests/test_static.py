@@ -0,0 +1,120 @@
+"""Tests for precompressed static frontend serving."""
+
+import gzip
+import os
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+from starlette.applications import Starlette
+from starlette.datastructures import Headers
+from starlette.routing import Mount
+
+from plank.static import IndexPage, PrecompressedStaticFiles
+
+
+@pytest.fixture
+def dist(tmp_path):
+    """Build a fake frontend/dist with hashed and precompressed assets."""
+    (tmp_path / "bundle-a1b2c3d4.js").write_text("console.log('plain')")
+    (tmp_path / "bundle-a1b2c3d4.js.br").write_bytes(b"brotli-bytes")
+    (tmp_path / "bundle-a1b2c3d4.js.gz").write_bytes(gzip.compress(b"console.log('plain')"))
+    (tmp_path / "favicon.js").write_text("x")
+    (tmp_path / "index.html").write_text("<html>v1</html>")
+    return tmp_path
+
+
+def client_for(directory):
+    app = Starlette(routes=[Mount("/static", PrecompressedStaticFiles(directory=directory))])
+    return AsyncClient(transport=ASGITransport(app=app), base_url="http://test")
+
+
+@pytest.mark.asyncio
+async def test_serves_preferred_precompressed_variant(dist):
+    """Test that br is preferred over gzip and headers describe the original file."""
+    async with client_for(dist) as client:
+        response = await client.get(
+            "/static/bundle-a1b2c3d4.js", headers={"Accept-Encoding": "gzip, br"}
+        )
+
+    assert response.status_code == 200
+    assert response.headers["content-encoding"] == "br"
+    assert response.headers["content-type"].startswith("text/javascript")
+    assert response.headers["cache-control"] == "public, max-age=31536000, immutable"
+    assert response.headers["vary"] == "Accept-Encoding"
+
+
+@pytest.mark.asyncio
+async def test_falls_back_to_identity(dist):
+    """Test that br;q=0 is honoured and unhashed files must be revalidated."""
+    async with client_for(dist) as client:
+        hashed = await client.get(
+            "/static/bundle-a1b2c3d4.js", headers={"Accept-Encoding": "br;q=0"}
+        )
+        plain = await client.get("/static/favicon.js", headers={"Accept-Encoding": "br"})
+
+    assert "content-encoding" not in hashed.headers
+    assert hashed.text == "console.log('plain')"
+    assert "content-encoding" not in plain.headers
+    assert plain.headers["cache-control"] == "no-cache"
+
+
+def test_index_page_etag_and_reload(dist):
+    """Test that index.html is cached with an ETag and reloaded when it changes."""
+    page = IndexPage(dist / "index.html")
+
+    first = page.response(Headers({"accept-encoding": "gzip"}))
+    assert first.headers["content-encoding"] == "gzip"
+    assert gzip.decompress(first.body) == b"<html>v1</html>"
+
+    etag = first.headers["etag"]
+    assert page.response(Headers({"accept-encoding": "gzip", "if-none-match": etag})).status_code == 304
+
+    index = dist / "index.html"
+    index.write_text("<html>v2</html>")
+    stat = index.stat()
+    os.utime(index, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+    updated = page.response(Headers({"accept-encoding": "gzip", "if-none-match": etag}))
+    assert updated.status_code == 200
+    assert gzip.decompress(updated.body) == b"<html>v2</html>"
+    assert updated.headers["etag"] != etag
+
+
+def test_index_page_etags_differ_per_encoding(dist):
+    """Test that gzip and identity bodies carry their own ETags and If-None-Match is a list."""
+    page = IndexPage(dist / "index.html")
+
+    gzipped = page.response(Headers({"accept-encoding": "gzip"})).headers["etag"]
+    identity = page.response(Headers({})).headers["etag"]
+    assert gzipped != identity
+
+    # A cached gzip body must not validate an identity request
+    assert page.response(Headers({"if-none-match": gzipped})).status_code == 200
+    both = f'W/"stale", W/{identity}, {gzipped}'
+    assert page.response(Headers({"if-none-match": both})).status_code == 304
+    assert page.response(Headers({"accept-encoding": "gzip", "if-none-match": both})).status_code == 304
+    assert page.response(Headers({"if-none-match": "*"})).status_code == 304
+
+
+def test_index_page_serves_prebuilt_variants(dist):
+    """Test that the build's .br/.gz siblings are served, unless older than the page."""
+    index = dist / "index.html"
+    (dist / "index.html.br").write_bytes(b"brotli-index")
+    (dist / "index.html.gz").write_bytes(gzip.compress(b"<html>v1</html>", mtime=0))
+    page = IndexPage(index)
+
+    br = page.response(Headers({"accept-encoding": "gzip, br"}))
+    assert br.headers["content-encoding"] == "br"
+    assert br.body == b"brotli-index"
+    assert br.headers["etag"].endswith('-br"')
+    gz = page.response(Headers({"accept-encoding": "gzip"}))
+    assert gz.body == (dist / "index.html.gz").read_bytes()
+    assert len({br.headers["etag"], gz.headers["etag"], page.response(Headers({})).headers["etag"]}) == 3
+
+    # A new page without new siblings: the stale ones must not be served
+    index.write_text("<html>v2</html>")
+    stat = index.stat()
+    os.utime(index, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    fallback = page.response(Headers({"accept-encoding": "gzip, br"}))
+    assert fallback.headers["content-encoding"] == "gzip"
+    assert gzip.decompress(fallback.body) == b"<html>v2</html>"
@@ -0,0 +1,74 @@
+"""Tests for instrumentation hooks and tracing."""
+
+import pytest
+
+from plank.db.listener import PostgresListener
+from plank.tracing import SlowQueryLog, Tracer, profile
+from plank.websocket.manager import ConnectionManager
+
+
+class FakeWebSocket:
+    """Collects sent text frames."""
+
+    def __init__(self):
+        self.sent: list[str] = []
+
+    async def send_text(self, text: str):
+        self.sent.append(text)
+
+
+@pytest.mark.asyncio
+async def test_tracer_follows_event_from_trigger_to_socket():
+    """Test that a sampled event gets every stage timed across listener and manager hooks."""
+    listener = PostgresListener()
+    manager = ConnectionManager()
+    manager.active_connections = [FakeWebSocket(), FakeWebSocket()]
+    tracer = Tracer(sample_rate=1.0)
+    listener.on_dispatch.append(tracer.on_dispatch)
+    manager.on_send.append(tracer.on_send)
+
+    events = []
+    listener.subscribe("item_changes", lambda channel, data: events.append(data))
+    await listener._notification_handler(
+        None, 1, "item_changes", '{"action": "INSERT", "id": 1, "ts": 1.0}'
+    )
+    await manager.broadcast(events[0])
+
+    [trace] = tracer.traces
+    assert trace["recipients"] == 2
+    assert set(trace["stages_ms"]) == {"db_to_listener", "dispatch", "queued", "send", "total"}
+    assert trace["stages_ms"]["db_to_listener"] > 0
+    assert "total" in tracer.summary()
+
+
+@pytest.mark.asyncio
+async def test_unsampled_events_are_not_traced():
+    """Test that a zero sample rate records nothing."""
+    manager = ConnectionManager()
+    tracer = Tracer(sample_rate=0.0)
+    event = {"action": "INSERT", "id": 1}
+
+    tracer.on_dispatch("item_changes", event, 0.0, 0.0)
+    await manager.broadcast(event)
+
+    assert not tracer.traces
+
+
+def test_slow_query_log(capsys):
+    """Test that only queries over the threshold are logged."""
+    log = SlowQueryLog(threshold_ms=100)
+
+    log("SELECT 1", (), 0.0, 0.01)
+    log("SELECT  *\n FROM items", (5,), 0.0, 0.25)
+
+    output = capsys.readouterr().out
+    assert "SELECT 1" not in output
+    assert "Slow query (250.0ms): SELECT * FROM items (5,)" in output
+
+
+@pytest.mark.asyncio
+async def test_profile_returns_report():
+    """Test that profiling the loop yields a pstats report."""
+    report = await profile(0.01, limit=5)
+
+    assert "function calls" in report
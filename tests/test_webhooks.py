@@ -0,0 +1,154 @@
+"""Tests for batched webhook delivery against a local stub server."""
+
+import asyncio
+import hashlib
+import hmac
+import json
+
+import pytest
+
+from plank.webhooks import WebhookDispatcher
+
+
+class StubServer:
+    """Minimal keep-alive HTTP/1.1 server recording POSTed JSON bodies."""
+
+    def __init__(self, statuses: list[int] | None = None):
+        # Status codes to answer with, in order; 200 once exhausted
+        self.statuses = list(statuses or [])
+        self.requests: list[tuple[dict, bytes]] = []
+        self.connections = 0
+        self.url = ""
+        self._server = None
+
+    async def __aenter__(self):
+        self._server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        port = self._server.sockets[0].getsockname()[1]
+        self.url = f"http://127.0.0.1:{port}/hook"
+        return self
+
+    async def __aexit__(self, *exc):
+        self._server.close()
+
+    async def _handle(self, reader, writer):
+        self.connections += 1
+        try:
+            while request_line := await reader.readline():
+                headers = {}
+                while (line := await reader.readline()) not in (b"\r\n", b""):
+                    name, _, value = line.decode().partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get("content-length", 0)))
+                assert request_line.startswith(b"POST /hook ")
+                self.requests.append((headers, body))
+
+                status = self.statuses.pop(0) if self.statuses else 200
+                writer.write(f"HTTP/1.1 {status} X\r\nContent-Length: 0\r\n\r\n".encode())
+                await writer.drain()
+        finally:
+            writer.close()
+
+    def batches(self) -> list[dict]:
+        return [json.loads(body) for _, body in self.requests]
+
+
+def make_dispatcher(url: str, **kwargs) -> WebhookDispatcher:
+    options = {"batch_size": 2, "batch_window": 0.05, "queue_size": 100, "retry_base": 0.01, "secret": ""}
+    options.update(kwargs)
+    return WebhookDispatcher(urls=[url], **options)
+
+
+async def wait_for(condition, timeout=2.0):
+    async with asyncio.timeout(timeout):
+        while not condition():
+            await asyncio.sleep(0.01)
+
+
+@pytest.mark.asyncio
+async def test_batches_by_size_and_time_over_one_connection():
+    """Test that events are batched in order and reuse a keep-alive connection."""
+    async with StubServer() as server:
+        dispatcher = make_dispatcher(server.url)
+        await dispatcher.start()
+
+        for i in range(5):
+            dispatcher.publish("item_changes", {"action": "INSERT", "id": i})
+        await wait_for(lambda: sum(len(b["events"]) for b in server.batches()) == 5)
+        await dispatcher.stop()
+
+    batches = server.batches()
+    assert [[e["id"] for e in batch["events"]] for batch in batches] == [[0, 1], [2, 3], [4]]
+    assert server.connections == 1
+    assert dispatcher.stats()[server.url] == {"queued": 0, "delivered": 5, "failed": 0}
+
+
+@pytest.mark.asyncio
+async def test_retries_server_errors_and_gives_up_on_client_errors():
+    """Test that 5xx is retried with backoff while 4xx is not, and the loss is reported."""
+    async with StubServer(statuses=[503, 500, 200, 400]) as server:
+        dispatcher = make_dispatcher(server.url, batch_size=1)
+        await dispatcher.start()
+
+        dispatcher.publish("item_changes", {"action": "INSERT", "id": 1})
+        await wait_for(lambda: dispatcher.endpoints[0].delivered == 1)
+        dispatcher.publish("item_changes", {"action": "INSERT", "id": 2})
+        await wait_for(lambda: dispatcher.endpoints[0].failed == 1)
+        dispatcher.publish("item_changes", {"action": "INSERT", "id": 3})
+        await wait_for(lambda: dispatcher.endpoints[0].delivered == 2)
+        await dispatcher.stop()
+
+    assert len(server.requests) == 5
+    assert server.batches()[-1]["dropped"] == 1
+
+
+@pytest.mark.asyncio
+async def test_full_queue_drops_oldest_and_reports_it():
+    """Test that a backed-up endpoint never blocks publishing and reports drops."""
+    async with StubServer() as server:
+        dispatcher = make_dispatcher(server.url, batch_size=10, queue_size=3)
+
+        # Publishing before the worker runs stands in for a stalled endpoint
+        for i in range(5):
+            dispatcher.publish("item_changes", {"action": "INSERT", "id": i})
+        await dispatcher.start()
+        await dispatcher.stop()
+
+    [batch] = server.batches()
+    assert [e["id"] for e in batch["events"]] == [2, 3, 4]
+    assert batch["dropped"] == 2
+
+
+@pytest.mark.asyncio
+async def test_batches_are_signed():
+    """Test that the body is signed with the shared secret."""
+    async with StubServer() as server:
+        dispatcher = make_dispatcher(server.url, batch_size=1, secret="s3cret")
+        await dispatcher.start()
+        dispatcher.publish("item_changes", {"action": "DELETE", "id": 1})
+        await wait_for(lambda: server.requests)
+        await dispatcher.stop()
+
+    headers, body = server.requests[0]
+    expected = hmac.new(b"s3cret", body, hashlib.sha256).hexdigest()
+    assert headers["x-plank-signature"] == f"sha256={expected}"
+
+
+@pytest.mark.asyncio
+async def test_given_up_batch_passes_on_its_drop_count():
+    """Test that overflow reported by an undelivered batch is reported again by the next one."""
+    async with StubServer(statuses=[400]) as server:
+        dispatcher = make_dispatcher(server.url, batch_size=10, queue_size=2)
+
+        # Three events overflow the queue before the worker runs
+        for i in range(5):
+            dispatcher.publish("item_changes", {"action": "INSERT", "id": i})
+        await dispatcher.start()
+        await wait_for(lambda: dispatcher.endpoints[0].failed == 2)
+        dispatcher.publish("item_changes", {"action": "INSERT", "id": 5})
+        await wait_for(lambda: dispatcher.endpoints[0].delivered == 1)
+        await dispatcher.stop()
+
+    rejected, batch = server.batches()
+    assert rejected["dropped"] == 3
+    assert [e["id"] for e in batch["events"]] == [5]
+    assert batch["dropped"] == 5